@@ -1,50 +1,129 @@
+import asyncio
+import functools
+import ipaddress
+import logging
 import os
 import uuid
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Optional
 
-import requests
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Query
-from pydantic import BaseModel, validator
+import aiofiles
+import httpx
+import orjson
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Query, Header, Request
+from fastapi.responses import ORJSONResponse
+from pydantic import AnyHttpUrl, BaseModel
 
 # 导入新版本的讯飞语音识别API
-from xfyun_asr_v2 import upload_audio, upload_audio_by_url, get_transcription_result
+from xfyun_asr_v2 import upload_audio, upload_audio_by_url_async, get_transcription_result_async, close_async_client
 
-app = FastAPI()
+# Redis为可选依赖，未安装或未配置REDIS_URL时只使用进程内缓存
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+# 讯飞接口模块使用logging输出日志，默认只输出INFO及以上级别，调试信息不会被格式化
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
 
 UPLOAD_DIR = Path('uploads')
 UPLOAD_DIR.mkdir(exist_ok=True)
 
-# 定义URL请求模型
-class UrlRequest(BaseModel):
-    url: str
-    app_id: Optional[str] = None
-    secret_key: Optional[str] = None
+# 流式读写的分块大小（1MB），保证单次上传/下载的内存占用恒定
+CHUNK_SIZE = 1024 * 1024
+
+# 分段并行下载的分段数，以及启用分段下载的最小文件大小
+DOWNLOAD_PARTS = 8
+MIN_RANGED_DOWNLOAD_SIZE = 8 * CHUNK_SIZE
+
+# 全局共享的异步HTTP客户端，复用连接池以避免每次下载都重新进行TCP/TLS握手
+http_client = httpx.AsyncClient(
+    timeout=30,
+    http2=True,
+    follow_redirects=True,
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+)
+
+# 转写结果的Redis缓存，多个worker进程之间共享
+REDIS_URL = os.environ.get('REDIS_URL')
+redis_client = None
+
+@asynccontextmanager
+async def lifespan(app):
+    global redis_client
+    if REDIS_URL:
+        if aioredis is None:
+            print('警告: 已配置REDIS_URL但未安装redis库，将不使用Redis缓存')
+        else:
+            # from_url会创建连接池，所有请求共享
+            redis_client = aioredis.from_url(REDIS_URL)
     
-    @validator('url')
-    def validate_url(cls, v):
-        if not v.startswith(('http://', 'https://')):
-            raise ValueError('URL必须以http://或https://开头')
-        return v
+    yield
+    
+    # 应用关闭时释放连接池
+    await http_client.aclose()
+    await close_async_client()
+    if redis_client is not None:
+        await redis_client.close()
+        redis_client = None
 
-# 定义URL直接上传请求模型
-class DirectUrlRequest(BaseModel):
-    url: str
+def redis_memoize(ttl):
+    """
+    使用Redis缓存转写结果查询的装饰器
+    
+    被装饰的函数返回(status, result, final)，只把(status, result)写入缓存并返回给调用方
+    
+    Args:
+        ttl: 函数 ttl(status, final)，返回缓存秒数，返回None表示永久缓存
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(task_id, *args, use_cache=True, **kwargs):
+            key = f'xfyun:{task_id}'
+            
+            if use_cache and redis_client is not None:
+                try:
+                    cached = await redis_client.get(key)
+                except Exception as e:
+                    print(f'读取Redis缓存失败: {e}')
+                    cached = None
+                if cached is not None:
+                    status, result = orjson.loads(cached)
+                    return status, result
+            
+            # 异步查询函数直接等待；同步查询函数放到线程中执行，避免阻塞事件循环
+            if asyncio.iscoroutinefunction(func):
+                status, result, final = await func(task_id, *args, use_cache=use_cache, **kwargs)
+            else:
+                status, result, final = await asyncio.to_thread(func, task_id, *args, use_cache=use_cache, **kwargs)
+            
+            if redis_client is not None:
+                try:
+                    await redis_client.set(key, orjson.dumps([status, result]), ex=ttl(status, final))
+                except Exception as e:
+                    print(f'写入Redis缓存失败: {e}')
+            
+            return status, result
+        return wrapper
+    return decorator
+
+# 使用orjson序列化响应，转写文本较大时明显降低编码开销
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# 定义URL请求模型，/upload/url 与 /upload/direct_url 共用
+# AnyHttpUrl 只接受 http:// 或 https:// 开头的合法URL
+class UrlRequest(BaseModel):
+    url: AnyHttpUrl
     app_id: Optional[str] = None
     secret_key: Optional[str] = None
-    
-    @validator('url')
-    def validate_url(cls, v):
-        if not v.startswith(('http://', 'https://')):
-            raise ValueError('URL必须以http://或https://开头')
-        return v
 
 # 文件上传和URL处理的共同逻辑
 async def process_input(input_path, app_id=None, secret_key=None):
     # 使用新版API直接上传文件并获取订单ID
     try:
-        # 根据是否提供API凭证调用不同版本的upload_audio
-        order_id = upload_audio(input_path, app_id, secret_key)
+        # upload_audio是同步阻塞调用，放到线程中执行，避免阻塞其他请求
+        order_id = await asyncio.to_thread(upload_audio, input_path, app_id, secret_key)
         return order_id
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"处理文件失败: {str(e)}")
@@ -57,44 +136,183 @@ async def upload_file(
     secret_key: str = Form(None)
 ):
     # 生成一个临时ID仅用于文件名
-    temp_id = str(uuid.uuid4())
+    temp_id = uuid.uuid4().hex
     file_name = file.filename or 'unknown_file'
     file_path = UPLOAD_DIR / f'{temp_id}_{file_name}'
     
-    # 保存上传的文件
-    with open(file_path, 'wb') as buffer:
-        buffer.write(await file.read())
+    # 分块流式保存上传的文件，避免整个文件读入内存
+    async with aiofiles.open(file_path, 'wb') as buffer:
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            await buffer.write(chunk)
     
     # 处理文件并获取内部任务ID
     task_id = await process_input(str(file_path), app_id, secret_key)
     
     return {'task_id': task_id, 'source_type': 'file', 'file_name': file_name}
 
+# 处理原始二进制上传的端点，请求体即文件内容（Content-Type: application/octet-stream）
+# 直接读取ASGI请求流写入磁盘，不经过multipart解析和临时文件，适合大文件上传
+@app.post('/upload/raw')
+async def upload_raw(
+    request: Request,
+    file_name: str = Query('raw_file'),
+    app_id: str = Header(None, alias='X-App-Id'),
+    secret_key: str = Header(None, alias='X-Secret-Key')
+):
+    # 生成一个临时ID仅用于文件名
+    temp_id = uuid.uuid4().hex
+    file_name = os.path.basename(file_name) or 'raw_file'
+    file_path = UPLOAD_DIR / f'{temp_id}_{file_name}'
+    
+    async with aiofiles.open(file_path, 'wb') as buffer:
+        async for chunk in request.stream():
+            await buffer.write(chunk)
+    
+    # 处理文件并获取内部任务ID
+    task_id = await process_input(str(file_path), app_id, secret_key)
+    
+    return {'task_id': task_id, 'source_type': 'raw', 'file_name': file_name}
+
+async def head_url(url):
+    """发送HEAD请求，请求失败时返回None；响应同时用于判断公网资源和分段下载，每个URL只请求一次"""
+    try:
+        return await http_client.head(url)
+    except httpx.HTTPError:
+        return None
+
+async def is_public_url(url, head):
+    """
+    判断URL是否可以由讯飞服务器直接拉取
+    
+    只有主机名全部解析为公网地址，并且HEAD请求成功时才认为是公网资源
+    """
+    if head is None or head.status_code >= 400:
+        return False
+    
+    host = httpx.URL(url).host
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None)
+    except OSError:
+        return False
+    
+    try:
+        if not infos or not all(ipaddress.ip_address(info[4][0]).is_global for info in infos):
+            return False
+    except ValueError:
+        return False
+    return True
+
+class RangeNotSupported(Exception):
+    """服务器未按Range请求返回206分段内容"""
+
+async def stream_download(url, file_path):
+    """使用单个连接流式下载URL内容到文件"""
+    async with http_client.stream('GET', url) as response:
+        response.raise_for_status()  # 确保请求成功
+        
+        # 分块流式保存内容到文件
+        async with aiofiles.open(file_path, 'wb') as f:
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                await f.write(chunk)
+
+async def fetch_range(url, fd, start, end):
+    """下载[start, end]字节区间，并写入文件中对应的偏移位置"""
+    headers = {'Range': f'bytes={start}-{end}'}
+    async with http_client.stream('GET', url, headers=headers) as response:
+        if response.status_code != 206:
+            raise RangeNotSupported(f'状态码: {response.status_code}')
+        
+        offset = start
+        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+            # 写文件是阻塞调用，放到线程中执行，不占用事件循环
+            await asyncio.to_thread(os.pwrite, fd, chunk, offset)
+            offset += len(chunk)
+    
+    if offset != end + 1:
+        raise IOError(f'分段下载不完整: bytes={start}-{end}')
+
+async def ranged_download(url, file_path, head, parts=DOWNLOAD_PARTS):
+    """
+    使用HTTP Range请求分段并行下载URL内容
+    
+    Args:
+        url: 下载地址
+        file_path: 保存路径
+        head: head_url返回的HEAD响应，请求失败时为None
+        parts: 分段数量
+    
+    Returns:
+        bool: 是否已完成下载；服务器不支持分段下载时返回False，由调用方回退到串行下载
+    """
+    if head is None or head.status_code != 200 or head.headers.get('accept-ranges', '').lower() != 'bytes':
+        return False
+    
+    size = int(head.headers.get('content-length') or 0)
+    if size < MIN_RANGED_DOWNLOAD_SIZE:
+        return False
+    
+    # 使用重定向后的最终地址，避免每个分段都重复跳转
+    url = str(head.url)
+    part_size = -(-size // parts)
+    ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+    
+    fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        # 预先分配文件空间，各分段直接写入自己的偏移位置
+        try:
+            os.posix_fallocate(fd, 0, size)
+        except (AttributeError, OSError):
+            os.ftruncate(fd, size)
+        
+        tasks = [asyncio.ensure_future(fetch_range(url, fd, start, end)) for start, end in ranges]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException as e:
+            # 任一分段失败时取消其余分段
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if isinstance(e, RangeNotSupported):
+                return False
+            raise
+    finally:
+        os.close(fd)
+    
+    return True
+
 # 处理URL的端点
 @app.post('/upload/url')
 async def upload_url(request: UrlRequest):
+    url = str(request.url)
+    
     # 生成一个临时ID仅用于文件名
-    temp_id = str(uuid.uuid4())
+    temp_id = uuid.uuid4().hex
     
     # 从URL获取文件名
-    url_path = request.url.split('?')[0]  # 移除查询参数
+    url_path = url.split('?')[0]  # 移除查询参数
     file_name = os.path.basename(url_path) or 'url_file'
     file_path = UPLOAD_DIR / f'{temp_id}_{file_name}'
     
-    # 下载URL内容
     try:
-        response = requests.get(request.url, stream=True, timeout=30)
-        response.raise_for_status()  # 确保请求成功
+        head = await head_url(url)
         
-        # 保存内容到文件
-        with open(file_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        # 公网URL直接交给讯飞服务器拉取，本地不需要下载和再次上传
+        if await is_public_url(url, head):
+            task_id = await upload_audio_by_url_async(url, request.app_id, request.secret_key)
+            if task_id:
+                return {'task_id': task_id, 'source_type': 'url', 'url': url}
+        
+        # 下载URL内容，优先使用分段并行下载，服务器不支持时回退到串行下载
+        if not await ranged_download(url, file_path, head):
+            await stream_download(url, file_path)
                 
         # 处理文件并获取内部任务ID
         task_id = await process_input(str(file_path), request.app_id, request.secret_key)
         
-        return {'task_id': task_id, 'source_type': 'url', 'url': request.url}
+        return {'task_id': task_id, 'source_type': 'url', 'url': url}
     except Exception as e:
         # 如果文件已创建但下载失败，删除它
         if file_path.exists():
@@ -103,15 +321,17 @@ async def upload_url(request: UrlRequest):
 
 # 处理URL的端点 (直接使用URL外链方式)
 @app.post('/upload/direct_url')
-async def upload_direct_url(request: DirectUrlRequest):
+async def upload_direct_url(request: UrlRequest):
+    url = str(request.url)
+    
     try:
         # 直接使用URL外链方式上传到讯飞 API
-        task_id = upload_audio_by_url(request.url, request.app_id, request.secret_key)
+        task_id = await upload_audio_by_url_async(url, request.app_id, request.secret_key)
         
         if not task_id:
             raise HTTPException(status_code=500, detail="上传失败，讯飞 API 返回空任务ID")
             
-        return {'task_id': task_id, 'source_type': 'direct_url', 'url': request.url}
+        return {'task_id': task_id, 'source_type': 'direct_url', 'url': url}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f'上传文件失败: {str(e)}')
 
@@ -127,11 +347,17 @@ class ResultRequest(BaseModel):
     secret_key: Optional[str] = None
     use_cache: bool = True
 
+# 已结束的任务（转写完成或订单失败）结果不会再变化，永久缓存；
+# 处理中的状态以及限流、网络异常等暂时性错误只缓存几秒，避免轮询时频繁请求讯飞API
+cached_transcription_result = redis_memoize(
+    ttl=lambda status, final: None if final else 3
+)(functools.partial(get_transcription_result_async, with_final=True))
+
 @app.post('/result')
 async def get_transcription(request: ResultRequest):
     try:
         # 使用新版API获取转写结果，传递缓存控制参数
-        status, result = get_transcription_result(request.task_id, request.app_id, request.secret_key, use_cache=request.use_cache)
+        status, result = await cached_transcription_result(request.task_id, request.app_id, request.secret_key, use_cache=request.use_cache)
         
         # 检查状态是否为'not_found'
         if status == 'not_found':
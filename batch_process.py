@@ -4,13 +4,13 @@
 批量处理视频/音频文件 - 基于科大讯飞语音转写API
 """
 import argparse
+import asyncio
 import os
 import time
-import glob
-import json
-from concurrent.futures import ThreadPoolExecutor
-from xfyun_asr import XfyunASR
-from video_to_text import process_video
+import orjson
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from xfyun_asr import VIDEO_EXTENSIONS, XfyunASR, extract_audio
+from video_to_text import get_output_file, save_transcript
 
 def find_media_files(input_dir, extensions=None):
     """
@@ -32,34 +32,89 @@ def find_media_files(input_dir, extensions=None):
             'mp3', 'wav', 'flac', 'ogg', 'm4a', 'aac', 'opus'
         ]
     
+    # str.endswith接受元组，在C层逐个比较后缀，无需为每个文件名切分子串
+    suffixes = tuple({f".{ext.lower().lstrip('.')}" for ext in extensions})
     media_files = []
     
-    for ext in extensions:
-        pattern = os.path.join(input_dir, f"*.{ext}")
-        media_files.extend(glob.glob(pattern))
-        # 检查子目录
-        pattern = os.path.join(input_dir, f"**/*.{ext}")
-        media_files.extend(glob.glob(pattern, recursive=True))
+    # 只遍历一次目录树（包括子目录），按扩展名过滤
+    for root, _, files in os.walk(input_dir):
+        for name in files:
+            if name.lower().endswith(suffixes):
+                media_files.append(os.path.join(root, name))
     
-    return sorted(set(media_files))  # 去重并排序
+    # 每个文件只会被访问一次，无需去重
+    return sorted(media_files)
 
-def process_file(args):
-    """处理单个文件的包装函数"""
-    file_path, app_id, secret_key, output_dir, verbose = args
+def submit_file(args):
+    """
+    阶段1：上传单个文件
+    
+    Args:
+        args: (原文件路径, 待上传的文件路径, app_id, secret_key)，
+              视频文件的待上传路径为已提取的临时音频文件，上传后删除
+    
+    Returns:
+        tuple: (原文件路径, 任务ID)，上传失败时任务ID为None
+    """
+    file_path, upload_path, app_id, secret_key = args
+    name = os.path.basename(file_path)
     
     try:
-        print(f"开始处理: {os.path.basename(file_path)}")
-        output_file = process_video(app_id, secret_key, file_path, output_dir, verbose)
+        print(f"开始上传: {name}")
+        with XfyunASR(app_id, secret_key) as asr:
+            task_id = asr.upload_file(upload_path)
         
-        if output_file:
-            print(f"完成: {os.path.basename(file_path)} -> {os.path.basename(output_file)}")
-            return True, file_path, output_file
-        else:
-            print(f"失败: {os.path.basename(file_path)}")
-            return False, file_path, None
+        if not task_id:
+            print(f"上传失败: {name}")
+        return file_path, task_id
+    except Exception as e:
+        print(f"上传文件时出错 {name}: {e}")
+        return file_path, None
+    finally:
+        if upload_path != file_path:
+            os.remove(upload_path)
+
+async def collect_file(asr, semaphore, file_path, task_id, output_dir, verbose):
+    """
+    阶段2：等待单个任务完成并保存结果
+    
+    Returns:
+        tuple: (文件路径, 输出文件路径)，失败时输出文件路径为None
+    """
+    try:
+        async with semaphore:
+            result = await asr.wait_for_result_async(task_id)
+        
+        if not result:
+            return file_path, None
+        
+        output_file = get_output_file(file_path, output_dir)
+        return file_path, await save_transcript(asr, result, output_file, verbose)
     except Exception as e:
-        print(f"处理文件时出错 {os.path.basename(file_path)}: {e}")
-        return False, file_path, None
+        # 单个任务的网络错误不能中断整个批次，其余任务继续轮询
+        print(f"获取转写结果时出错 {os.path.basename(file_path)}: {e}")
+        return file_path, None
+
+async def collect_results(asr, pending, output_dir, verbose, max_polls):
+    """
+    阶段2：在同一个事件循环中并发轮询所有任务，先完成的任务先返回
+    
+    Args:
+        asr: XfyunASR对象
+        pending: 字典 {文件路径: 任务ID}
+        output_dir: 输出目录
+        verbose: 是否显示详细信息
+        max_polls: 同时轮询的最大任务数量
+        
+    Yields:
+        tuple: (文件路径, 输出文件路径)，失败或超时时输出文件路径为None
+    """
+    semaphore = asyncio.Semaphore(max_polls)
+    coros = [collect_file(asr, semaphore, file_path, task_id, output_dir, verbose)
+             for file_path, task_id in pending.items()]
+    
+    for future in asyncio.as_completed(coros):
+        yield await future
 
 def main():
     """主函数"""
@@ -68,7 +123,8 @@ def main():
     parser.add_argument('--secret_key', required=True, help='应用密钥')
     parser.add_argument('--input_dir', required=True, help='输入目录，包含要处理的媒体文件')
     parser.add_argument('--output_dir', help='输出目录，默认为输入目录')
-    parser.add_argument('--max_workers', type=int, default=1, help='最大并行处理数量，默认为1')
+    parser.add_argument('--max_workers', type=int, default=8, help='最大并行处理数量，默认为8')
+    parser.add_argument('--max_polls', type=int, default=100, help='同时轮询结果的最大任务数量，默认为100')
     parser.add_argument('--extensions', help='要处理的文件扩展名，用逗号分隔，例如: mp4,avi,mp3')
     parser.add_argument('--verbose', action='store_true', help='显示详细信息')
     
@@ -97,41 +153,73 @@ def main():
     
     print(f"找到 {len(media_files)} 个媒体文件")
     
-    # 创建任务列表
-    tasks = [(file_path, args.app_id, args.secret_key, output_dir, args.verbose) 
-             for file_path in media_files]
-    
-    # 处理结果统计
+    # 处理结果统计，每个文件的结果在完成时立即以一行JSON追加到报告文件中
     results = {
         'total': len(media_files),
         'success': 0,
-        'failed': 0,
-        'details': []
+        'failed': 0
     }
+    report_file = os.path.join(output_dir, "batch_process_report.jsonl")
+    
+    def record(file_path, output_file):
+        name = os.path.basename(file_path)
+        if output_file:
+            output_name = os.path.basename(output_file)
+            print(f"完成: {name} -> {output_name}")
+            results['success'] += 1
+            entry = {'file': name, 'status': 'success', 'output': output_name}
+        else:
+            print(f"失败: {name}")
+            results['failed'] += 1
+            entry = {'file': name, 'status': 'failed'}
+        report.write(orjson.dumps(entry) + b'\n')
     
     # 开始计时
     start_time = time.time()
     
-    # 使用线程池并行处理文件
-    with ThreadPoolExecutor(max_workers=args.max_workers) as executor:
-        for success, file_path, output_file in executor.map(process_file, tasks):
-            if success:
-                results['success'] += 1
-                results['details'].append({
-                    'file': os.path.basename(file_path),
-                    'status': 'success',
-                    'output': os.path.basename(output_file)
-                })
+    with open(report_file, 'ab') as report:
+        # 阶段0：视频文件先在进程池中提取音频，ffmpeg转码是CPU密集型任务，按CPU核数并行
+        upload_paths = {file_path: file_path for file_path in media_files}
+        video_files = [file_path for file_path in media_files
+                       if os.path.splitext(file_path)[1].lower() in VIDEO_EXTENSIONS]
+        if video_files:
+            print(f"正在提取 {len(video_files)} 个视频文件的音频...")
+            with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+                for file_path, audio_path in zip(video_files, pool.map(extract_audio, video_files)):
+                    if audio_path:
+                        upload_paths[file_path] = audio_path
+                    else:
+                        del upload_paths[file_path]
+                        record(file_path, None)
+        
+        # 阶段1：使用线程池并行上传所有文件
+        tasks = [(file_path, upload_path, args.app_id, args.secret_key)
+                 for file_path, upload_path in upload_paths.items()]
+        with ThreadPoolExecutor(max_workers=args.max_workers) as executor:
+            submitted = list(executor.map(submit_file, tasks))
+        
+        pending = {}
+        for file_path, task_id in submitted:
+            if task_id:
+                pending[file_path] = task_id
             else:
-                results['failed'] += 1
-                results['details'].append({
-                    'file': os.path.basename(file_path),
-                    'status': 'failed'
-                })
-    
-    # 计算总耗时
-    elapsed_time = time.time() - start_time
-    results['elapsed_time'] = f"{elapsed_time:.2f}秒"
+                record(file_path, None)
+        
+        # 阶段2：在一个事件循环中统一轮询所有任务，完成一个保存一个
+        asr = XfyunASR(args.app_id, args.secret_key)
+        
+        async def collect():
+            async for file_path, output_file in collect_results(asr, pending, output_dir, args.verbose, args.max_polls):
+                record(file_path, output_file)
+        
+        asyncio.run(collect())
+        
+        # 计算总耗时
+        elapsed_time = time.time() - start_time
+        results['elapsed_time'] = f"{elapsed_time:.2f}秒"
+        
+        # 最后一行写入汇总信息
+        report.write(orjson.dumps({'_summary': results}) + b'\n')
     
     # 输出结果摘要
     print("\n处理完成!")
@@ -139,15 +227,7 @@ def main():
     print(f"成功: {results['success']} 个文件")
     print(f"失败: {results['failed']} 个文件")
     print(f"总耗时: {results['elapsed_time']}")
-    
-    # 保存处理报告
-    report_file = os.path.join(output_dir, "batch_process_report.json")
-    try:
-        with open(report_file, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
-        print(f"处理报告已保存到: {report_file}")
-    except Exception as e:
-        print(f"保存处理报告失败: {e}")
+    print(f"处理报告已保存到: {report_file}")
 
 if __name__ == '__main__':
     main()
@@ -50,8 +50,8 @@ def main():
     # 保存到文件
     if args.output_file:
         try:
-            with open(args.output_file, 'w', encoding='utf-8') as f:
-                f.write(full_text)
+            with open(args.output_file, 'wb', buffering=1024 * 1024) as f:
+                f.write(full_text.encode('utf-8'))
             print(f"\n转写结果已保存到文件: {args.output_file}")
         except Exception as e:
             print(f"保存文件失败: {e}")
@@ -4,12 +4,79 @@
 视频转文字工具 - 基于科大讯飞语音转写API
 """
 import argparse
+import asyncio
 import os
 import time
-import json
+import aiofiles
+import orjson
 from xfyun_asr import XfyunASR
 
-def process_video(app_id, secret_key, video_path, output_dir=None, verbose=False):
+async def aio_write(path, data):
+    """异步写入字节数据到文件"""
+    async with aiofiles.open(path, 'wb') as f:
+        await f.write(data)
+
+def get_output_file(video_path, output_dir=None):
+    """
+    确定转写结果的输出文件路径
+    
+    Args:
+        video_path: 视频文件路径
+        output_dir: 输出目录，默认为视频所在目录
+    
+    Returns:
+        str: 文本输出文件路径，原始JSON结果保存在同名的.json文件中
+    """
+    video_dir = os.path.dirname(video_path) or '.'
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    
+    if output_dir:
+        # 确保输出目录存在
+        os.makedirs(output_dir, exist_ok=True)
+    else:
+        output_dir = video_dir
+    
+    return os.path.join(output_dir, f"{video_name}_transcript.txt")
+
+async def save_transcript(asr, result, output_file, verbose=False):
+    """
+    同时保存文本结果和原始JSON结果
+    
+    Args:
+        asr: XfyunASR对象，用于格式化文本
+        result: 转写结果
+        output_file: 文本输出文件路径
+        verbose: 是否显示详细信息
+    
+    Returns:
+        str: 输出文件路径，保存失败时返回None
+    """
+    # 格式化为完整文本
+    full_text = asr.format_transcript_to_text(result)
+    
+    json_output_file = os.path.splitext(output_file)[0] + '.json'
+    text_saved, json_saved = await asyncio.gather(
+        aio_write(output_file, full_text.encode('utf-8')),
+        aio_write(json_output_file, orjson.dumps(result, option=orjson.OPT_INDENT_2)),
+        return_exceptions=True
+    )
+    
+    if isinstance(text_saved, Exception):
+        print(f"保存文件失败: {text_saved}")
+        return None
+    
+    if verbose:
+        print(f"转写结果已保存到文件: {output_file}")
+    
+    if isinstance(json_saved, Exception):
+        if verbose:
+            print(f"保存JSON文件失败: {json_saved}")
+    elif verbose:
+        print(f"原始JSON结果已保存到文件: {json_output_file}")
+    
+    return output_file
+
+async def process_video(app_id, secret_key, video_path, output_dir=None, verbose=False):
     """
     处理视频文件，提取音频并转写为文本
     
@@ -28,17 +95,8 @@ def process_video(app_id, secret_key, video_path, output_dir=None, verbose=False
         print(f"错误: 视频文件不存在: {video_path}")
         return None
     
-    # 确定输出目录和文件名
-    video_dir = os.path.dirname(video_path) or '.'
-    video_name = os.path.splitext(os.path.basename(video_path))[0]
-    
-    if output_dir:
-        # 确保输出目录存在
-        os.makedirs(output_dir, exist_ok=True)
-    else:
-        output_dir = video_dir
-    
-    output_file = os.path.join(output_dir, f"{video_name}_transcript.txt")
+    # 确定输出文件
+    output_file = get_output_file(video_path, output_dir)
     
     # 初始化ASR对象
     asr = XfyunASR(app_id, secret_key)
@@ -48,7 +106,7 @@ def process_video(app_id, secret_key, video_path, output_dir=None, verbose=False
         print(f"正在处理视频: {video_path}")
         print("正在提取音频并上传...")
     
-    task_id = asr.upload_file(video_path)
+    task_id = await asyncio.to_thread(asr.upload_file, video_path)
     
     if not task_id:
         print("上传失败，请检查视频文件格式或网络连接")
@@ -60,43 +118,18 @@ def process_video(app_id, secret_key, video_path, output_dir=None, verbose=False
     
     # 等待并获取结果
     start_time = time.time()
-    result = asr.wait_for_result(task_id)
+    result = await asr.wait_for_result_async(task_id)
     
     if not result:
         print("获取结果失败")
         return None
     
-    # 计算转写耗时
-    elapsed_time = time.time() - start_time
-    
-    # 格式化为完整文本
-    full_text = asr.format_transcript_to_text(result)
-    
-    # 保存到文件
-    try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(full_text)
-        
-        if verbose:
-            print(f"\n转写完成! 耗时: {elapsed_time:.2f}秒")
-            print(f"转写结果已保存到文件: {output_file}")
-    except Exception as e:
-        print(f"保存文件失败: {e}")
-        return None
-    
-    # 保存原始JSON结果
-    json_output_file = os.path.join(output_dir, f"{video_name}_transcript.json")
-    try:
-        with open(json_output_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
-        
-        if verbose:
-            print(f"原始JSON结果已保存到文件: {json_output_file}")
-    except Exception as e:
-        if verbose:
-            print(f"保存JSON文件失败: {e}")
+    if verbose:
+        # 计算转写耗时
+        elapsed_time = time.time() - start_time
+        print(f"\n转写完成! 耗时: {elapsed_time:.2f}秒")
     
-    return output_file
+    return await save_transcript(asr, result, output_file, verbose)
 
 def main():
     """主函数"""
@@ -109,13 +142,13 @@ def main():
     
     args = parser.parse_args()
     
-    output_file = process_video(
+    output_file = asyncio.run(process_video(
         args.app_id,
         args.secret_key,
         args.video_path,
         args.output_dir,
         args.verbose
-    )
+    ))
     
     if output_file:
         print(f"视频转写完成，结果保存在: {output_file}")
@@ -18,17 +18,37 @@
 """
 
 import argparse
+import asyncio
 import base64
 import hashlib
 import hmac
+import io
 import json
+import mmap
 import os
 import time
+import subprocess
 import sys
 import tempfile
-import requests
 import uuid
-from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from operator import itemgetter
+from xfyun_http import create_session, next_delay
+
+# orjson为可选依赖，解析和输出较大的转写结果时比json快数倍，未安装时使用标准库
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    orjson = None
+    _loads = json.loads
+
+# requests_toolbelt为可选依赖，安装后分片以流的方式上传，不在内存中拼接multipart请求体
+try:
+    from requests_toolbelt import MultipartEncoder
+except ImportError:
+    MultipartEncoder = None
 
 # 尝试不同的moviepy导入方式
 try:
@@ -50,13 +70,71 @@ API_MERGE = '/merge'
 API_GET_PROGRESS = '/getProgress'
 API_GET_RESULT = '/getResult'
 
-# 文件分片大小（10MB）
+# getResult在结果尚未就绪时返回的错误码：26605 任务正在处理中，26603 接口访问频率受限
+RESULT_NOT_READY_CODES = ('26605', '26603')
+
+# 各接口的完整URL和表单请求头，只构建一次
+_URLS = {name: LFASR_HOST + name for name in (API_PREPARE, API_UPLOAD, API_MERGE, API_GET_PROGRESS, API_GET_RESULT)}
+_FORM_HEADERS = {'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8'}
+
+# 默认文件分片大小（10MB），可通过环境变量XFYUN_PIECE_SIZE（字节）覆盖
 FILE_PIECE_SIZE = 10 * 1024 * 1024
 
+# 分片并行上传的并发数量
+UPLOAD_CONCURRENCY = 5
+
+# 需要先提取音频轨道的视频格式
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.flv', '.mkv')
+
 # 异步任务队列
 task_queue = {}
 executor = ThreadPoolExecutor(max_workers=5)
 
+
+class SliceReader(io.RawIOBase):
+    """将内存映射文件中的一段数据包装为只读文件对象，上传时按需读取"""
+    
+    def __init__(self, buffer, start, end):
+        """
+        初始化
+        
+        Args:
+            buffer: 支持缓冲区协议的对象（如mmap）
+            start: 起始位置
+            end: 结束位置（不包含）
+        """
+        self._view = memoryview(buffer)[start:end]
+        self._pos = 0
+    
+    def __len__(self):
+        return len(self._view)
+    
+    def readable(self):
+        return True
+    
+    def seekable(self):
+        return True
+    
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = min(max(offset, 0), len(self._view))
+        return self._pos
+    
+    def readinto(self, b):
+        n = min(len(b), len(self._view) - self._pos)
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+    
+    def close(self):
+        # 释放对mmap的引用，否则mmap无法关闭
+        self._view.release()
+        super().close()
+
+
 class SliceIdGenerator:
     """生成上传分片ID的工具类"""
     
@@ -77,23 +155,54 @@ class SliceIdGenerator:
                 j = j - 1
         self.__ch = ch
         return self.__ch
+    
+    @classmethod
+    def generate(cls, n):
+        """
+        一次性生成前n个分片ID，与连续调用n次get_next_slice_id的结果相同
+        
+        分片ID是以'a'为0的10位26进制数，第i个分片的ID即整数i的26进制表示
+        
+        Args:
+            n: 分片数量
+            
+        Returns:
+            list: 分片ID列表
+        """
+        slice_ids = []
+        for index in range(n):
+            chars = []
+            for _ in range(10):
+                index, digit = divmod(index, 26)
+                chars.append(chr(ord('a') + digit))
+            slice_ids.append(''.join(reversed(chars)))
+        return slice_ids
 
 
-class XfyunASR:
-    """科大讯飞语音转写API封装类"""
+class ParamBuilder:
+    """生成接口签名和请求参数，不持有HTTP会话，同步和异步客户端共用"""
     
-    def __init__(self, app_id, secret_key):
+    def __init__(self, app_id, secret_key, piece_size=None):
         """
         初始化
         
         Args:
             app_id: 科大讯飞开放平台应用ID
             secret_key: 应用密钥
+            piece_size: 上传分片大小（字节），默认读取环境变量XFYUN_PIECE_SIZE，未设置时为10MB
         """
         self.app_id = app_id
         self.secret_key = secret_key
+        # 签名所需的字节串只编码一次（时间戳和MD5十六进制串均为ASCII字符）
+        self._app_id_bytes = app_id.encode('utf-8')
+        self._secret_key_bytes = secret_key.encode('utf-8')
+        if piece_size is None:
+            piece_size = int(os.environ.get('XFYUN_PIECE_SIZE', FILE_PIECE_SIZE))
+        if piece_size <= 0:
+            raise ValueError(f"分片大小必须为正整数: {piece_size}")
+        self.piece_size = piece_size
     
-    def _generate_signature(self):
+    def generate_signature(self):
         """
         生成API调用签名
         
@@ -104,19 +213,14 @@ class XfyunASR:
         ts = str(int(time.time()))
         
         # 计算baseString的MD5值
-        m = hashlib.md5()
-        m.update((self.app_id + ts).encode('utf-8'))
-        md5_str = m.hexdigest()
-        md5_bytes = md5_str.encode('utf-8')
+        md5_bytes = hashlib.md5(self._app_id_bytes + ts.encode('ascii')).hexdigest().encode('ascii')
         
-        # 使用secret_key对MD5值进行HMAC-SHA1加密
-        signa = hmac.new(self.secret_key.encode('utf-8'), md5_bytes, hashlib.sha1).digest()
-        signa = base64.b64encode(signa)
-        signa = signa.decode('utf-8')
+        # 使用secret_key对MD5值进行HMAC-SHA1加密（hmac.digest走OpenSSL快速路径，不创建HMAC对象）
+        signa = base64.b64encode(hmac.digest(self._secret_key_bytes, md5_bytes, 'sha1')).decode('utf-8')
         
         return signa, ts
     
-    def _generate_params(self, api_name, task_id=None, slice_id=None, file_path=None):
+    def generate_params(self, api_name, task_id=None, slice_id=None, file_path=None, file_len=None, file_name=None):
         """
         根据API名称生成请求参数
         
@@ -125,12 +229,14 @@ class XfyunASR:
             task_id: 任务ID
             slice_id: 分片ID
             file_path: 文件路径
+            file_len: 文件大小（可选，已知时不再读取文件信息）
+            file_name: 文件名（可选，已知时不再从路径中解析）
             
         Returns:
             dict: 请求参数字典
         """
         # 生成签名和时间戳
-        signa, ts = self._generate_signature()
+        signa, ts = self.generate_signature()
         
         # 构建基本参数
         params = {
@@ -141,10 +247,12 @@ class XfyunASR:
         
         # 根据不同API添加特定参数
         if api_name == API_PREPARE and file_path:
-            file_len = os.path.getsize(file_path)
-            file_name = os.path.basename(file_path)
+            if file_len is None:
+                file_len = os.path.getsize(file_path)
+            if file_name is None:
+                file_name = os.path.basename(file_path)
             # 计算分片数量
-            slice_num = int(file_len / FILE_PIECE_SIZE) + (0 if (file_len % FILE_PIECE_SIZE == 0) else 1)
+            slice_num = int(file_len / self.piece_size) + (0 if (file_len % self.piece_size == 0) else 1)
             
             params.update({
                 'file_len': str(file_len),
@@ -164,7 +272,7 @@ class XfyunASR:
         elif api_name == API_MERGE and task_id and file_path:
             params.update({
                 'task_id': task_id,
-                'file_name': os.path.basename(file_path)
+                'file_name': file_name or os.path.basename(file_path)
             })
         
         elif (api_name == API_GET_PROGRESS or api_name == API_GET_RESULT) and task_id:
@@ -173,6 +281,57 @@ class XfyunASR:
             })
         
         return params
+
+
+class XfyunASR:
+    """科大讯飞语音转写API封装类"""
+    
+    def __init__(self, app_id, secret_key, piece_size=None):
+        """
+        初始化
+        
+        Args:
+            app_id: 科大讯飞开放平台应用ID
+            secret_key: 应用密钥
+            piece_size: 上传分片大小（字节），默认读取环境变量XFYUN_PIECE_SIZE，未设置时为10MB
+        """
+        self.app_id = app_id
+        self.secret_key = secret_key
+        self._builder = ParamBuilder(app_id, secret_key, piece_size=piece_size)
+        self.piece_size = self._builder.piece_size
+        # 普通请求共用一个带自动重试的会话
+        self.session = create_session()
+        # 流式上传的分片使用不自动重试的会话，MultipartEncoder读完后无法重新发送
+        self.upload_session = create_session(pool_connections=1, pool_maxsize=UPLOAD_CONCURRENCY, retry=False)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """关闭HTTP会话，释放连接池"""
+        self.session.close()
+        self.upload_session.close()
+    
+    def _generate_signature(self):
+        """
+        生成API调用签名
+        
+        Returns:
+            tuple: (signature, timestamp)
+        """
+        return self._builder.generate_signature()
+    
+    def _generate_params(self, api_name, **kwargs):
+        """
+        根据API名称生成请求参数，参数说明见ParamBuilder.generate_params
+        
+        Returns:
+            dict: 请求参数字典
+        """
+        return self._builder.generate_params(api_name, **kwargs)
     
     def _send_request(self, api_name, params, files=None):
         """
@@ -186,19 +345,28 @@ class XfyunASR:
         Returns:
             dict: 响应结果
         """
-        url = LFASR_HOST + api_name
+        url = _URLS[api_name]
         
-        # 设置请求头
+        # 设置请求头，上传接口为multipart请求，由requests生成Content-Type
         headers = None
+        session = self.session
         if api_name != API_UPLOAD:
-            headers = {'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8'}
+            headers = _FORM_HEADERS
+        elif files and MultipartEncoder is not None:
+            # 流式编码multipart请求体，边读取分片边发送
+            fields = dict(params)
+            fields.update((name, (name, content)) for name, content in files.items())
+            params = MultipartEncoder(fields=fields)
+            headers = {'Content-Type': params.content_type}
+            files = None
+            session = self.upload_session
         
         # 发送请求
-        response = requests.post(url, data=params, files=files, headers=headers)
+        response = session.post(url, data=params, files=files, headers=headers)
         
         # 解析响应
         try:
-            result = json.loads(response.text)
+            result = _loads(response.content)
             if result.get('ok') == 0:
                 return result
             else:
@@ -210,83 +378,107 @@ class XfyunASR:
             print(f"原始响应: {response.text}")
             return {'ok': -1, 'err_no': -1, 'failed': str(e), 'data': None}
     
-    def prepare(self, file_path):
+    def prepare(self, file_path, file_len=None, file_name=None):
         """
         预处理接口
         
         Args:
             file_path: 音频文件路径
+            file_len: 文件大小（可选）
+            file_name: 文件名（可选）
             
         Returns:
             str: 任务ID
         """
-        params = self._generate_params(API_PREPARE, file_path=file_path)
+        params = self._generate_params(API_PREPARE, file_path=file_path, file_len=file_len, file_name=file_name)
         result = self._send_request(API_PREPARE, params)
         
         if result.get('ok') == 0:
             return result.get('data')
         return None
     
-    def upload(self, task_id, file_path):
+    def _upload_slice(self, task_id, view, slice_id, offset):
         """
-        上传文件接口
+        上传单个文件分片
+        
+        Args:
+            task_id: 任务ID
+            view: 整个文件映射的memoryview
+            slice_id: 分片ID
+            offset: 分片在文件中的起始位置
+            
+        Returns:
+            dict: 响应结果
+        """
+        params = self._generate_params(API_UPLOAD, task_id=task_id, slice_id=slice_id)
+        
+        # 直接从内存映射中按需读取分片数据，不为分片额外分配和复制缓冲区
+        with SliceReader(view, offset, offset + self.piece_size) as content:
+            files = {
+                'content': content
+            }
+            return self._send_request(API_UPLOAD, params, files=files)
+    
+    def upload(self, task_id, file_path, concurrency=UPLOAD_CONCURRENCY):
+        """
+        上传文件接口，各分片通过线程池并行上传
         
         Args:
             task_id: 任务ID
             file_path: 音频文件路径
+            concurrency: 同时上传的分片数量
             
         Returns:
             bool: 是否上传成功
         """
         try:
-            with open(file_path, 'rb') as file_obj:
-                index = 1
-                sig = SliceIdGenerator()
+            with open(file_path, 'rb') as file_obj, \
+                    mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                    memoryview(mm) as view:
+                # 预先生成全部分片ID，分片与ID的对应关系与顺序上传时一致
+                slice_num = int(len(mm) / self.piece_size) + (0 if (len(mm) % self.piece_size == 0) else 1)
+                slice_ids = SliceIdGenerator.generate(slice_num)
                 
-                while True:
-                    # 读取文件分片
-                    content = file_obj.read(FILE_PIECE_SIZE)
-                    if not content or len(content) == 0:
-                        break
-                    
-                    # 获取下一个分片ID
-                    slice_id = sig.get_next_slice_id()
-                    
-                    # 构建请求参数
-                    params = self._generate_params(API_UPLOAD, task_id=task_id, slice_id=slice_id)
-                    
-                    # 构建文件数据
-                    files = {
-                        'content': content
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    futures = {
+                        pool.submit(self._upload_slice, task_id, view, slice_id, i * self.piece_size): i + 1
+                        for i, slice_id in enumerate(slice_ids)
                     }
                     
-                    # 发送请求
-                    result = self._send_request(API_UPLOAD, params, files=files)
-                    
-                    if result.get('ok') != 0:
-                        print(f"上传分片 {index} 失败: {result}")
-                        return False
-                    
-                    print(f"上传分片 {index} 成功")
-                    index += 1
+                    for future in as_completed(futures):
+                        index = futures[future]
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            result = {'ok': -1, 'err_no': -1, 'failed': str(e)}
+                        
+                        if result.get('ok') != 0:
+                            print(f"上传分片 {index} 失败: {result}")
+                            # 取消尚未开始的分片
+                            for pending in futures:
+                                pending.cancel()
+                            return False
+                        
+                        print(f"上传分片 {index} 成功")
             
             return True
         except Exception as e:
             print(f"上传文件失败: {e}")
             return False
     
-    def merge(self, task_id, file_path):
+    def merge(self, task_id, file_path, file_name=None):
         """
         合并文件接口
         
         Args:
             task_id: 任务ID
             file_path: 音频文件路径
+            file_name: 文件名（可选）
             
         Returns:
             bool: 是否合并成功
         """
-        params = self._generate_params(API_MERGE, task_id=task_id, file_path=file_path)
+        params = self._generate_params(API_MERGE, task_id=task_id, file_path=file_path, file_name=file_name)
         result = self._send_request(API_MERGE, params)
         
         return result.get('ok') == 0
@@ -306,7 +498,7 @@ class XfyunASR:
         
         if result.get('ok') == 0 and result.get('data'):
             try:
-                return json.loads(result.get('data'))
+                return _loads(result.get('data'))
             except:
                 return {'status': -1, 'desc': '解析进度信息失败'}
         
@@ -323,15 +515,31 @@ class XfyunASR:
             list: 转写结果列表
         """
         params = self._generate_params(API_GET_RESULT, task_id=task_id)
-        result = self._send_request(API_GET_RESULT, params)
+        status, data = self._parse_result_response(self._send_request(API_GET_RESULT, params))
         
-        if result.get('ok') == 0 and result.get('data'):
+        return data if status == 'completed' else []
+    
+    @staticmethod
+    def _parse_result_response(result):
+        """
+        解析getResult接口的响应
+        
+        Args:
+            result: 接口响应
+            
+        Returns:
+            tuple: (状态, 转写结果列表)，状态为'completed'、'processing'或'failed'，未完成时结果为None
+        """
+        if result.get('ok') == 0:
             try:
-                return json.loads(result.get('data'))
+                return 'completed', _loads(result['data']) if result.get('data') else []
             except:
-                return []
+                return 'completed', []
+        
+        if str(result.get('err_no')) in RESULT_NOT_READY_CODES:
+            return 'processing', None
         
-        return []
+        return 'failed', None
     
     def upload_file(self, file_path):
         """
@@ -343,13 +551,14 @@ class XfyunASR:
         Returns:
             str: 任务ID
         """
-        # 检查文件是否存在
-        if not os.path.exists(file_path):
+        # 检查文件是否存在，文件大小只读取一次并传给后续接口
+        try:
+            file_size = os.path.getsize(file_path)
+        except OSError:
             print(f"文件不存在: {file_path}")
             return None
         
         # 检查文件大小
-        file_size = os.path.getsize(file_path)
         if file_size > 500 * 1024 * 1024:  # 500MB
             print("文件大小超过500MB限制")
             return None
@@ -359,65 +568,57 @@ class XfyunASR:
         temp_audio_file = None
         
         # 如果是视频文件，提取音频
-        if file_ext in ['.mp4', '.avi', '.mov', '.flv', '.mkv']:
+        if file_ext in VIDEO_EXTENSIONS:
             print(f"检测到视频文件: {file_path}")
             print("正在提取音频轨道...")
-            try:
-                # 创建临时文件
-                temp_fd, temp_audio_file = tempfile.mkstemp(suffix='.mp3')
-                os.close(temp_fd)
-                
-                # 提取音频
-                video = VideoFileClip(file_path)
-                video.audio.write_audiofile(temp_audio_file, codec='mp3')
-                video.close()
-                
-                print(f"音频提取成功: {temp_audio_file}")
-                file_path = temp_audio_file
-            except Exception as e:
-                print(f"提取音频失败: {e}")
-                if temp_audio_file and os.path.exists(temp_audio_file):
-                    os.remove(temp_audio_file)
+            # 优先直接调用ffmpeg只解码音频轨道，系统中没有ffmpeg时退回到moviepy
+            temp_audio_file = extract_audio(file_path)
+            if temp_audio_file is None and VideoFileClip is not None:
+                temp_audio_file = _extract_audio_moviepy(file_path)
+            if not temp_audio_file:
                 return None
+            
+            print(f"音频提取成功: {temp_audio_file}")
+            file_path = temp_audio_file
         
-        # 1. 预处理
-        print("正在预处理...")
-        task_id = self.prepare(file_path)
-        if not task_id:
-            print("预处理失败")
-            # 如果是临时文件，删除它
-            if temp_audio_file and os.path.exists(temp_audio_file):
-                os.remove(temp_audio_file)
-            return None
-        
-        print(f"获取任务ID: {task_id}")
-        
-        # 2. 上传文件
-        print("正在上传文件...")
-        if not self.upload(task_id, file_path):
-            print("上传文件失败")
-            # 如果是临时文件，删除它
-            if temp_audio_file and os.path.exists(temp_audio_file):
-                os.remove(temp_audio_file)
-            return None
-        
-        # 3. 合并文件
-        print("正在合并文件...")
-        if not self.merge(task_id, file_path):
-            print("合并文件失败")
-            # 如果是临时文件，删除它
-            if temp_audio_file and os.path.exists(temp_audio_file):
-                os.remove(temp_audio_file)
-            return None
-        
-        # 如果是临时文件，删除它
-        if temp_audio_file and os.path.exists(temp_audio_file):
-            os.remove(temp_audio_file)
+        # 无论成功与否，最后都删除提取音频生成的临时文件
+        try:
+            if temp_audio_file:
+                file_size = os.path.getsize(file_path)
+            file_name = os.path.basename(file_path)
+            
+            # 1. 预处理
+            print("正在预处理...")
+            task_id = self.prepare(file_path, file_len=file_size, file_name=file_name)
+            if not task_id:
+                print("预处理失败")
+                return None
+            
+            print(f"获取任务ID: {task_id}")
+            
+            # 2. 上传文件
+            print("正在上传文件...")
+            if not self.upload(task_id, file_path):
+                print("上传文件失败")
+                return None
+            
+            # 3. 合并文件
+            print("正在合并文件...")
+            if not self.merge(task_id, file_path, file_name=file_name):
+                print("合并文件失败")
+                return None
+        finally:
+            if temp_audio_file:
+                try:
+                    os.unlink(temp_audio_file)
+                except FileNotFoundError:
+                    pass
         
         print("文件上传成功，任务ID:", task_id)
         return task_id
     
-    def format_transcript_to_text(self, transcript_data):
+    @staticmethod
+    def format_transcript_to_text(transcript_data):
         """
         将转写结果格式化为完整文本
         
@@ -430,49 +631,42 @@ class XfyunASR:
         if not transcript_data or not isinstance(transcript_data, list):
             return ""
         
-        # 按时间顺序排序片段
-        sorted_segments = sorted(transcript_data, key=lambda x: int(x.get('bg', 0)))
+        # 按时间顺序排序片段，每个片段的起始时间只转换一次
+        decorated = [(int(segment.get('bg', 0)), segment) for segment in transcript_data]
+        decorated.sort(key=itemgetter(0))
         
-        # 提取所有的 onebest 并组装
-        full_text = ""
-        speaker_texts = {}
+        # 提取所有的 (说话人, onebest)
+        pairs = [(segment.get('speaker', '0'), segment.get('onebest', '')) for _, segment in decorated]
         
-        for segment in sorted_segments:
-            onebest = segment.get('onebest', '')
-            speaker = segment.get('speaker', '0')
-            
-            # 按说话人分组
-            if speaker not in speaker_texts:
-                speaker_texts[speaker] = []
-            
-            speaker_texts[speaker].append(onebest)
+        # 单个说话人（最常见的情况）直接拼接，无需分组
+        if len({speaker for speaker, _ in pairs}) <= 1:
+            return " ".join(text for _, text in pairs).strip()
         
-        # 生成完整文本，按说话人分段
-        if len(speaker_texts) > 1:  # 多个说话人
-            for speaker, texts in speaker_texts.items():
-                speaker_text = " ".join(texts)
-                full_text += f"说话人 {speaker}：{speaker_text}\n\n"
-        else:  # 单个说话人
-            all_texts = []
-            for texts in speaker_texts.values():
-                all_texts.extend(texts)
-            full_text = " ".join(all_texts)
+        # 多个说话人时按说话人分组分段
+        speaker_texts = defaultdict(list)
+        for speaker, text in pairs:
+            speaker_texts[speaker].append(text)
         
+        full_text = "\n\n".join(f"说话人 {speaker}：{' '.join(texts)}" for speaker, texts in speaker_texts.items())
         return full_text.strip()
     
-    def wait_for_result(self, task_id, interval=10, timeout=3600):
+    def wait_for_result(self, task_id, interval=2, timeout=3600, max_interval=60):
         """
-        等待并获取转写结果
+        等待并获取转写结果，轮询间隔按指数退避增长
+        
+        直接轮询getResult接口，任务未完成时接口返回"处理中"错误码，每轮只需一次请求
         
         Args:
             task_id: 任务ID
-            interval: 轮询间隔（秒）
+            interval: 初始轮询间隔（秒）
             timeout: 超时时间（秒）
+            max_interval: 最大轮询间隔（秒）
             
         Returns:
             list: 转写结果列表
         """
         start_time = time.time()
+        attempt = 0
         
         while True:
             # 检查是否超时
@@ -480,25 +674,118 @@ class XfyunASR:
                 print("等待结果超时")
                 return None
             
-            # 获取进度
-            progress = self.get_progress(task_id)
-            status = progress.get('status', -1)
+            # 查询结果
+            params = self._generate_params(API_GET_RESULT, task_id=task_id)
+            status, data = self._parse_result_response(self._send_request(API_GET_RESULT, params))
             
-            if status == 9:  # 转写完成
-                print("转写完成，正在获取结果...")
-                return self.get_result(task_id)
-            elif status >= 0:
-                desc = progress.get('desc', '处理中')
-                print(f"任务状态: {desc} (状态码: {status})")
-            else:
-                print(f"获取进度失败: {progress}")
+            if status == 'completed':
+                print("转写完成")
+                return data
+            elif status == 'failed':
+                print("获取结果失败")
                 return None
             
+            print("转写处理中...")
+            
             # 等待一段时间再次查询
-            time.sleep(interval)
+            time.sleep(next_delay(attempt, interval, max_interval))
+            attempt += 1
+    
+    async def wait_for_result_async(self, task_id, interval=2, max_interval=60, timeout=3600):
+        """
+        异步等待并获取转写结果，轮询间隔按指数退避增长（2秒、4秒、8秒……直至上限）
+        
+        上限与wait_for_result相同为60秒，超时时间内的getResult调用次数不超过接口对每个任务100次的限制
+        
+        Args:
+            task_id: 任务ID
+            interval: 初始轮询间隔（秒）
+            max_interval: 最大轮询间隔（秒）
+            timeout: 超时时间（秒）
+            
+        Returns:
+            list: 转写结果列表
+        """
+        start_time = time.time()
+        attempt = 0
+        
+        while True:
+            # 检查是否超时
+            if time.time() - start_time > timeout:
+                print("等待结果超时")
+                return None
+            
+            # 查询结果，阻塞的HTTP请求放到线程中执行，不占用事件循环
+            params = self._generate_params(API_GET_RESULT, task_id=task_id)
+            response = await asyncio.to_thread(self._send_request, API_GET_RESULT, params)
+            status, data = self._parse_result_response(response)
+            
+            if status == 'completed':
+                print("转写完成")
+                return data
+            elif status == 'failed':
+                print("获取结果失败")
+                return None
+            
+            print("转写处理中...")
+            
+            await asyncio.sleep(next_delay(attempt, interval, max_interval))
+            attempt += 1
 
 
-def process_audio(file_path, app_id=None, secret_key=None):
+def extract_audio(file_path):
+    """
+    使用ffmpeg从视频文件中提取音频轨道（单声道、16kHz的mp3）
+    
+    每个ffmpeg进程只使用一个线程，并发度由调用方（如进程池）显式控制
+    
+    Args:
+        file_path: 视频文件路径
+        
+    Returns:
+        str: 临时音频文件路径，提取失败时返回None
+    """
+    temp_fd, temp_audio_file = tempfile.mkstemp(suffix='.mp3')
+    os.close(temp_fd)
+    
+    try:
+        subprocess.run(
+            ['ffmpeg', '-y', '-threads', '1', '-i', file_path,
+             '-vn', '-ac', '1', '-ar', '16000', '-b:a', '64k', temp_audio_file],
+            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"提取音频失败 {os.path.basename(file_path)}: {e}")
+        os.remove(temp_audio_file)
+        return None
+    
+    return temp_audio_file
+
+def _extract_audio_moviepy(file_path):
+    """
+    使用moviepy从视频文件中提取音频轨道，仅在ffmpeg命令不可用时使用
+    
+    Args:
+        file_path: 视频文件路径
+        
+    Returns:
+        str: 临时音频文件路径，提取失败时返回None
+    """
+    temp_fd, temp_audio_file = tempfile.mkstemp(suffix='.mp3')
+    os.close(temp_fd)
+    
+    try:
+        video = VideoFileClip(file_path)
+        video.audio.write_audiofile(temp_audio_file, codec='mp3')
+        video.close()
+    except Exception as e:
+        print(f"提取音频失败: {e}")
+        os.remove(temp_audio_file)
+        return None
+    
+    return temp_audio_file
+
+def process_audio(file_path, app_id=None, secret_key=None, piece_size=None):
     """
     处理音频文件并上传到科大讯飞服务器
     
@@ -506,6 +793,7 @@ def process_audio(file_path, app_id=None, secret_key=None):
         file_path: 音频文件路径
         app_id: 科大讯飞应用ID（可选）
         secret_key: 应用密钥（可选）
+        piece_size: 上传分片大小（字节，可选）
         
     Returns:
         str: 科大讯飞API任务ID
@@ -517,11 +805,11 @@ def process_audio(file_path, app_id=None, secret_key=None):
         secret_key = os.environ.get('XFYUN_SECRET_KEY', 'YOUR_SECRET_KEY')
     
     # 创建讯飞实例并上传文件
-    asr = XfyunASR(app_id, secret_key)
-    xfyun_task_id = asr.upload_file(file_path)
+    with XfyunASR(app_id, secret_key, piece_size=piece_size) as asr:
+        xfyun_task_id = asr.upload_file(file_path)
     return xfyun_task_id
 
-def async_process(audio_path, app_id=None, secret_key=None):
+def async_process(audio_path, app_id=None, secret_key=None, piece_size=None):
     """
     异步处理音频文件
     
@@ -529,15 +817,16 @@ def async_process(audio_path, app_id=None, secret_key=None):
         audio_path: 音频文件路径
         app_id: 科大讯飞应用ID（可选）
         secret_key: 应用密钥（可选）
+        piece_size: 上传分片大小（字节，可选）
         
     Returns:
         str: 内部任务ID，用于查询转写结果
     """
     # 生成内部任务ID
-    internal_task_id = str(uuid.uuid4())
+    internal_task_id = uuid.uuid4().hex
     
     # 异步提交处理任务
-    future = executor.submit(process_audio, audio_path, app_id, secret_key)
+    future = executor.submit(process_audio, audio_path, app_id, secret_key, piece_size)
     
     # 将任务信息存入队列
     task_queue[internal_task_id] = {
@@ -552,9 +841,25 @@ def async_process(audio_path, app_id=None, secret_key=None):
     
     return internal_task_id
 
+def _print_json(data):
+    """
+    以缩进格式将结果输出到标准输出，安装orjson时直接写入编码后的字节
+    
+    Args:
+        data: 要输出的数据
+    """
+    if orjson is None:
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+        return
+    
+    # 先刷新文本缓冲区，保证与之前print的内容顺序一致
+    sys.stdout.flush()
+    sys.stdout.buffer.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS) + b'\n')
+    sys.stdout.buffer.flush()
+
 def upload_command(args):
     """上传文件命令处理函数"""
-    task_id = async_process(args.file_path)
+    task_id = async_process(args.file_path, piece_size=args.piece_size)
     
     if task_id:
         result = {
@@ -568,7 +873,7 @@ def upload_command(args):
             "message": "文件上传失败"
         }
     
-    print(json.dumps(result, ensure_ascii=False, indent=2))
+    _print_json(result)
     return result
 
 
@@ -609,8 +914,8 @@ def get_result_command(args):
             # 如果需要保存到文件
             if args.output_file:
                 try:
-                    with open(args.output_file, 'w', encoding='utf-8') as f:
-                        f.write(full_text)
+                    with open(args.output_file, 'wb', buffering=1024 * 1024) as f:
+                        f.write(full_text.encode('utf-8'))
                     print(f"\n完整文本已保存到文件: {args.output_file}")
                 except Exception as e:
                     print(f"保存文件失败: {e}")
@@ -620,7 +925,7 @@ def get_result_command(args):
             "message": "获取结果失败或转写尚未完成"
         }
     
-    print(json.dumps(result, ensure_ascii=False, indent=2))
+    _print_json(result)
     return result
 
 
@@ -634,6 +939,7 @@ def main():
     upload_parser.add_argument('--app_id', required=True, help='科大讯飞应用ID')
     upload_parser.add_argument('--secret_key', required=True, help='应用密钥')
     upload_parser.add_argument('--file_path', required=True, help='音频文件路径')
+    upload_parser.add_argument('--piece_size', type=int, help='上传分片大小（字节），默认读取环境变量XFYUN_PIECE_SIZE，未设置时为10MB')
     upload_parser.set_defaults(func=upload_command)
     
     # 获取结果子命令
@@ -642,7 +948,7 @@ def main():
     result_parser.add_argument('--secret_key', required=True, help='应用密钥')
     result_parser.add_argument('--task_id', required=True, help='任务ID')
     result_parser.add_argument('--wait', action='store_true', help='是否等待结果')
-    result_parser.add_argument('--interval', type=int, default=10, help='轮询间隔（秒）')
+    result_parser.add_argument('--interval', type=int, default=2, help='初始轮询间隔（秒），之后按指数退避增长')
     result_parser.add_argument('--timeout', type=int, default=3600, help='超时时间（秒）')
     result_parser.add_argument('--format_text', action='store_true', help='是否将结果格式化为完整文本')
     result_parser.add_argument('--output_file', help='将完整文本保存到文件')
@@ -0,0 +1,375 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+科大讯飞语音转写API异步插件
+基于aiohttp实现，在单个进程中并发上传和轮询多个转写任务
+
+使用方法：
+python xfyun_asr_async.py --app_id YOUR_APP_ID --secret_key YOUR_SECRET_KEY --file_path FILE1 FILE2 ...
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import aiohttp
+
+from xfyun_asr import (
+    API_GET_PROGRESS, API_GET_RESULT, API_MERGE, API_PREPARE, API_UPLOAD,
+    UPLOAD_CONCURRENCY, VIDEO_EXTENSIONS, _URLS,
+    ParamBuilder, SliceIdGenerator, XfyunASR, _loads, extract_audio
+)
+from xfyun_http import next_delay
+
+
+class AsyncXfyunASR:
+    """
+    科大讯飞语音转写API异步封装类
+    
+    不继承XfyunASR，签名和参数生成委托给ParamBuilder，结果解析和文本格式化复用XfyunASR的静态方法
+    """
+    
+    # 与XfyunASR共用的结果格式化方法
+    format_transcript_to_text = staticmethod(XfyunASR.format_transcript_to_text)
+    
+    def __init__(self, app_id, secret_key, piece_size=None, concurrency=UPLOAD_CONCURRENCY):
+        """
+        初始化
+        
+        Args:
+            app_id: 科大讯飞开放平台应用ID
+            secret_key: 应用密钥
+            piece_size: 上传分片大小（字节），默认与XfyunASR相同
+            concurrency: 同时进行的HTTP请求数量（上传和轮询共用）
+        """
+        self.app_id = app_id
+        self.secret_key = secret_key
+        self._builder = ParamBuilder(app_id, secret_key, piece_size=piece_size)
+        self.piece_size = self._builder.piece_size
+        self.concurrency = concurrency
+        self._aio_session = None
+        self._semaphore = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+    
+    async def aclose(self):
+        """关闭aiohttp会话"""
+        if self._aio_session is not None:
+            await self._aio_session.close()
+            self._aio_session = None
+    
+    def _get_session(self):
+        """
+        获取aiohttp会话，首次调用时在当前事件循环中创建
+            
+        Returns:
+            aiohttp.ClientSession: HTTP会话
+        """
+        if self._aio_session is None:
+            connector = aiohttp.TCPConnector(limit=20, limit_per_host=10)
+            self._aio_session = aiohttp.ClientSession(connector=connector)
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._aio_session
+    
+    async def _send_request(self, api_name, params, content=None):
+        """
+        发送HTTP请求
+        
+        Args:
+            api_name: API名称
+            params: 请求参数
+            content: 分片数据，仅上传接口使用
+            
+        Returns:
+            dict: 响应结果
+        """
+        url = _URLS[api_name]
+        session = self._get_session()
+        
+        if content is None:
+            data = params
+        else:
+            data = aiohttp.FormData(params)
+            data.add_field('content', content, filename='content')
+        
+        try:
+            async with self._semaphore:
+                async with session.post(url, data=data) as response:
+                    body = await response.read()
+        except aiohttp.ClientError as e:
+            print(f"请求失败: {e}")
+            return {'ok': -1, 'err_no': -1, 'failed': str(e), 'data': None}
+        
+        # 解析响应
+        try:
+            result = _loads(body)
+            if result.get('ok') != 0:
+                print(f"API调用失败: {result.get('failed', '未知错误')}")
+            return result
+        except Exception as e:
+            print(f"解析响应失败: {e}")
+            print(f"原始响应: {body.decode('utf-8', errors='replace')}")
+            return {'ok': -1, 'err_no': -1, 'failed': str(e), 'data': None}
+    
+    async def prepare(self, file_path, file_len=None, file_name=None):
+        """
+        预处理接口
+        
+        Args:
+            file_path: 音频文件路径
+            file_len: 文件大小（可选）
+            file_name: 文件名（可选）
+            
+        Returns:
+            str: 任务ID
+        """
+        params = self._builder.generate_params(API_PREPARE, file_path=file_path, file_len=file_len, file_name=file_name)
+        result = await self._send_request(API_PREPARE, params)
+        
+        if result.get('ok') == 0:
+            return result.get('data')
+        return None
+    
+    def _read_slice(self, file_path, offset):
+        """读取从offset开始的一个分片"""
+        with open(file_path, 'rb') as file_obj:
+            file_obj.seek(offset)
+            return file_obj.read(self.piece_size)
+    
+    async def upload(self, task_id, file_path):
+        """
+        上传文件接口，各分片并发上传
+        
+        Args:
+            task_id: 任务ID
+            file_path: 音频文件路径
+            
+        Returns:
+            bool: 是否上传成功
+        """
+        file_len = os.path.getsize(file_path)
+        slice_num = int(file_len / self.piece_size) + (0 if (file_len % self.piece_size == 0) else 1)
+        slice_ids = SliceIdGenerator.generate(slice_num)
+        
+        # 分片在获得名额后才读取，内存中最多同时存在concurrency个分片
+        slots = asyncio.Semaphore(self.concurrency)
+        
+        async def post_slice(index, slice_id):
+            async with slots:
+                content = await asyncio.to_thread(self._read_slice, file_path, index * self.piece_size)
+                params = self._builder.generate_params(API_UPLOAD, task_id=task_id, slice_id=slice_id)
+                result = await self._send_request(API_UPLOAD, params, content=content)
+            
+            if result.get('ok') != 0:
+                print(f"上传分片 {index + 1} 失败: {result}")
+                return False
+            
+            print(f"上传分片 {index + 1} 成功")
+            return True
+        
+        tasks = [asyncio.ensure_future(post_slice(i, slice_id)) for i, slice_id in enumerate(slice_ids)]
+        try:
+            for future in asyncio.as_completed(tasks):
+                if not await future:
+                    return False
+            return True
+        except Exception as e:
+            print(f"上传文件失败: {e}")
+            return False
+        finally:
+            # 任一分片失败时取消其余分片
+            for task in tasks:
+                task.cancel()
+    
+    async def merge(self, task_id, file_path, file_name=None):
+        """
+        合并文件接口
+        
+        Args:
+            task_id: 任务ID
+            file_path: 音频文件路径
+            file_name: 文件名（可选）
+            
+        Returns:
+            bool: 是否合并成功
+        """
+        params = self._builder.generate_params(API_MERGE, task_id=task_id, file_path=file_path, file_name=file_name)
+        result = await self._send_request(API_MERGE, params)
+        
+        return result.get('ok') == 0
+    
+    async def get_progress(self, task_id):
+        """
+        获取进度接口
+        
+        Args:
+            task_id: 任务ID
+            
+        Returns:
+            dict: 进度信息
+        """
+        params = self._builder.generate_params(API_GET_PROGRESS, task_id=task_id)
+        result = await self._send_request(API_GET_PROGRESS, params)
+        
+        if result.get('ok') == 0 and result.get('data'):
+            try:
+                return _loads(result.get('data'))
+            except:
+                return {'status': -1, 'desc': '解析进度信息失败'}
+        
+        return {'status': -1, 'desc': result.get('failed', '获取进度失败')}
+    
+    async def get_result(self, task_id):
+        """
+        获取结果接口
+        
+        Args:
+            task_id: 任务ID
+            
+        Returns:
+            list: 转写结果列表
+        """
+        params = self._builder.generate_params(API_GET_RESULT, task_id=task_id)
+        status, data = XfyunASR._parse_result_response(await self._send_request(API_GET_RESULT, params))
+        
+        return data if status == 'completed' else []
+    
+    async def upload_file(self, file_path):
+        """
+        上传文件并获取任务ID，视频文件先用ffmpeg提取音频
+        
+        Args:
+            file_path: 音频或视频文件路径
+            
+        Returns:
+            str: 任务ID
+        """
+        try:
+            file_size = os.path.getsize(file_path)
+        except OSError:
+            print(f"文件不存在: {file_path}")
+            return None
+        
+        if file_size > 500 * 1024 * 1024:  # 500MB
+            print("文件大小超过500MB限制")
+            return None
+        
+        temp_audio_file = None
+        if os.path.splitext(file_path)[1].lower() in VIDEO_EXTENSIONS:
+            print(f"检测到视频文件: {file_path}")
+            temp_audio_file = await asyncio.to_thread(extract_audio, file_path)
+            if not temp_audio_file:
+                return None
+            file_path = temp_audio_file
+            file_size = os.path.getsize(file_path)
+        
+        file_name = os.path.basename(file_path)
+        try:
+            task_id = await self.prepare(file_path, file_len=file_size, file_name=file_name)
+            if not task_id:
+                print("预处理失败")
+                return None
+            
+            if not await self.upload(task_id, file_path):
+                print("上传文件失败")
+                return None
+            
+            if not await self.merge(task_id, file_path, file_name=file_name):
+                print("合并文件失败")
+                return None
+        finally:
+            if temp_audio_file:
+                os.remove(temp_audio_file)
+        
+        print("文件上传成功，任务ID:", task_id)
+        return task_id
+    
+    async def wait_for_result(self, task_id, interval=2, timeout=3600, max_interval=60):
+        """
+        等待并获取转写结果，直接轮询getResult接口，轮询间隔按指数退避增长
+        
+        Args:
+            task_id: 任务ID
+            interval: 初始轮询间隔（秒）
+            timeout: 超时时间（秒）
+            max_interval: 最大轮询间隔（秒）
+            
+        Returns:
+            list: 转写结果列表
+        """
+        start_time = time.time()
+        attempt = 0
+        
+        while True:
+            if time.time() - start_time > timeout:
+                print("等待结果超时")
+                return None
+            
+            params = self._builder.generate_params(API_GET_RESULT, task_id=task_id)
+            status, data = XfyunASR._parse_result_response(await self._send_request(API_GET_RESULT, params))
+            
+            if status == 'completed':
+                print("转写完成")
+                return data
+            elif status == 'failed':
+                print("获取结果失败")
+                return None
+            
+            print("转写处理中...")
+            
+            await asyncio.sleep(next_delay(attempt, interval, max_interval))
+            attempt += 1
+    
+    # 与XfyunASR.wait_for_result_async保持相同的调用方式
+    wait_for_result_async = wait_for_result
+
+
+async def transcribe_files(app_id, secret_key, file_paths, concurrency=UPLOAD_CONCURRENCY):
+    """
+    并发转写多个文件
+    
+    Args:
+        app_id: 科大讯飞应用ID
+        secret_key: 应用密钥
+        file_paths: 文件路径列表
+        concurrency: 同时进行的HTTP请求数量
+    
+    Returns:
+        dict: {文件路径: 完整文本}，失败的文件对应None
+    """
+    async with AsyncXfyunASR(app_id, secret_key, concurrency=concurrency) as asr:
+        async def transcribe(file_path):
+            task_id = await asr.upload_file(file_path)
+            if not task_id:
+                return None
+            result = await asr.wait_for_result(task_id)
+            return asr.format_transcript_to_text(result) if result else None
+        
+        texts = await asyncio.gather(*[transcribe(file_path) for file_path in file_paths])
+    
+    return dict(zip(file_paths, texts))
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='科大讯飞语音转写API异步工具')
+    parser.add_argument('--app_id', required=True, help='科大讯飞应用ID')
+    parser.add_argument('--secret_key', required=True, help='应用密钥')
+    parser.add_argument('--file_path', required=True, nargs='+', help='音频或视频文件路径，可指定多个')
+    parser.add_argument('--concurrency', type=int, default=UPLOAD_CONCURRENCY, help='同时进行的HTTP请求数量')
+    
+    args = parser.parse_args()
+    
+    texts = asyncio.run(transcribe_files(args.app_id, args.secret_key, args.file_path, args.concurrency))
+    
+    print(json.dumps(texts, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
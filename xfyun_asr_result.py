@@ -6,10 +6,212 @@
 """
 import os
 import time
+import asyncio
 import hashlib
 import base64
 import json
-import requests
+import aiohttp
+from collections import defaultdict
+from functools import lru_cache
+from typing import List, Optional, Union
+from xfyun_http import create_session, next_delay
+
+# orjson为可选依赖，未安装时使用标准库json
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# msgspec为可选依赖，安装后按固定结构解码json_1best和getProgress响应，只生成需要的字段
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if msgspec is not None:
+    class _CW(msgspec.Struct):
+        w: str
+
+    class _Word(msgspec.Struct):
+        cw: List[_CW]
+
+    class _RT(msgspec.Struct):
+        ws: List[_Word]
+
+    class _ST(msgspec.Struct):
+        rt: List[_RT]
+
+    class _Best(msgspec.Struct):
+        st: _ST
+
+    _best_decoder = msgspec.json.Decoder(_Best)
+
+    class _Progress(msgspec.Struct):
+        status: Optional[int] = None
+        progress: int = 0
+
+    # getProgress响应中的data本身是一个JSON字符串，需要再解码一次
+    class _ProgressResp(msgspec.Struct):
+        ok: Union[bool, int] = False
+        err_no: Optional[int] = None
+        failed: Optional[str] = None
+        data: Optional[str] = None
+
+    _progress_resp_decoder = msgspec.json.Decoder(_ProgressResp)
+    _progress_decoder = msgspec.json.Decoder(_Progress)
+else:
+    _best_decoder = None
+    _progress_resp_decoder = None
+    _progress_decoder = None
+
+def _decode_response(api_name, content):
+    """
+    解析接口响应，getProgress响应中的data是JSON字符串，一并解码为字典
+    
+    Args:
+        api_name: API名称
+        content: 响应体字节串
+        
+    Returns:
+        dict: 响应结果
+    """
+    if api_name != "getProgress":
+        return _loads(content)
+    
+    if _progress_resp_decoder is not None:
+        try:
+            resp = _progress_resp_decoder.decode(content)
+            data = _progress_decoder.decode(resp.data) if resp.data else None
+            return {
+                "ok": resp.ok,
+                "err_no": resp.err_no,
+                "failed": resp.failed,
+                "data": {"status": data.status, "progress": data.progress} if data is not None else None
+            }
+        except msgspec.DecodeError:
+            # 结构不符合预期时按通用方式解析
+            pass
+    
+    result = _loads(content)
+    data = result.get("data")
+    if isinstance(data, str) and data:
+        try:
+            result["data"] = _loads(data)
+        except ValueError:
+            result["data"] = None
+    return result
+
+def _words_from_1best(raw):
+    """
+    从一句话的json_1best中提取所有字词
+    
+    Args:
+        raw: json_1best字符串
+        
+    Returns:
+        list: 字词列表
+    """
+    if _best_decoder is not None:
+        try:
+            best = _best_decoder.decode(raw)
+            return [character.w for word in best.st.rt[0].ws for character in word.cw]
+        except msgspec.DecodeError:
+            # 结构不符合预期时按通用方式解析
+            pass
+    
+    json_result = _loads(raw)
+    if "st" in json_result and "rt" in json_result["st"]:
+        return [character["w"] for word in json_result["st"]["rt"][0]["ws"] for character in word["cw"]]
+    return []
+
+
+class ProgressPoller:
+    """
+    批量轮询转写进度：所有等待中的任务共用一个后台轮询协程，
+    每轮用asyncio.gather并发请求全部任务的getProgress，任务结束时通知对应的Future
+    """
+    def __init__(self, client, interval=2, max_interval=60):
+        """
+        初始化
+        
+        Args:
+            client: XfyunASRResult实例，用于发送getProgress请求
+            interval: 初始轮询间隔（秒）
+            max_interval: 最大轮询间隔（秒）
+        """
+        self.client = client
+        self.interval = interval
+        self.max_interval = max_interval
+        # task_id -> 等待该任务结束的Future
+        self.pending = {}
+        self._task = None
+    
+    async def wait(self, task_id):
+        """
+        等待任务转写结束
+        
+        Args:
+            task_id: 任务ID
+            
+        Returns:
+            dict: 任务结束时的进度信息，status为9表示完成，小于0表示失败
+        """
+        fut = self.pending.get(task_id)
+        if fut is None:
+            fut = self.pending[task_id] = asyncio.get_running_loop().create_future()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+        try:
+            return await fut
+        finally:
+            # 等待方超时或取消时不再轮询该任务
+            if self.pending.get(task_id) is fut:
+                del self.pending[task_id]
+    
+    async def _loop(self):
+        """后台轮询协程，没有等待中的任务时退出；轮询出错时把异常交给所有等待方，避免它们一直等到超时"""
+        try:
+            await self._poll()
+        except Exception as e:
+            for fut in self.pending.values():
+                if not fut.done():
+                    fut.set_exception(e)
+            self.pending.clear()
+    
+    async def _poll(self):
+        """依次轮询所有等待中的任务，直至全部结束"""
+        attempt = 0
+        last_statuses = {}
+        while self.pending:
+            await asyncio.sleep(next_delay(attempt, self.interval, self.max_interval))
+            attempt += 1
+            
+            task_ids = list(self.pending)
+            progresses = await asyncio.gather(*[self.client.get_progress_async(task_id) for task_id in task_ids])
+            
+            for task_id, progress in zip(task_ids, progresses):
+                fut = self.pending.get(task_id)
+                if fut is None or fut.done():
+                    # 等待方已超时或取消
+                    self.pending.pop(task_id, None)
+                    continue
+                status = progress.get("status") if progress else None
+                if status is None:
+                    # 请求失败或响应中没有状态码，下一轮再查询
+                    print(f"获取进度失败: {task_id}")
+                    continue
+                
+                if status == 9 or status < 0:
+                    fut.set_result(progress)
+                    del self.pending[task_id]
+                    continue
+                
+                print(f"任务 {task_id} 转写进度: {progress.get('progress', 0)}%，状态码: {status}")
+                # 任一任务状态变化时重新从初始间隔开始
+                if last_statuses.get(task_id) != status:
+                    last_statuses[task_id] = status
+                    attempt = 0
 
 class XfyunASRResult:
     """科大讯飞语音转写API结果查询封装类"""
@@ -24,7 +226,36 @@ class XfyunASRResult:
         self.app_id = app_id
         self.secret_key = secret_key
         self.base_url = "https://raasr.xfyun.cn/api"
+        # 各接口的完整URL和公共请求头只构造一次
+        self._urls = {name: f"{self.base_url}/{name}" for name in ("getProgress", "getResult")}
+        self._headers = {"User-Agent": "xfyun-asr-tool/1.0"}
+        # 签名所需的字节串只编码一次
+        self._app_id_bytes = app_id.encode()
+        self._secret_key_bytes = secret_key.encode()
         self.task_queue = {}
+        self.session = create_session()
+        self.session.headers.update(self._headers)
+        # 异步接口使用的aiohttp会话，首次使用时在当前事件循环中创建
+        self._aio_session = None
+        # 异步等待结果时共用的进度轮询器，首次使用时创建
+        self._poller = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """关闭HTTP会话，释放连接池"""
+        self.session.close()
+    
+    async def aclose(self):
+        """关闭异步HTTP会话和同步HTTP会话"""
+        if self._aio_session is not None:
+            await self._aio_session.close()
+            self._aio_session = None
+        self.close()
     
     def _generate_signature(self):
         """
@@ -35,10 +266,8 @@ class XfyunASRResult:
         """
         # 当前时间戳，13位
         timestamp = str(int(time.time() * 1000))
-        # 拼接字符串
-        base_string = self.app_id + timestamp
-        # 使用应用密钥生成hmac-sha1签名
-        signature = hashlib.md5(base_string.encode() + self.secret_key.encode()).hexdigest()
+        # 对 app_id + 时间戳 + 应用密钥 计算一次MD5
+        signature = hashlib.md5(self._app_id_bytes + timestamp.encode('ascii') + self._secret_key_bytes).hexdigest()
         return signature, timestamp
     
     def _generate_params(self, api_name, task_id=None):
@@ -76,17 +305,43 @@ class XfyunASRResult:
         Returns:
             dict: 响应结果
         """
-        url = f"{self.base_url}/{api_name}"
+        url = self._urls[api_name]
         
         try:
-            response = requests.post(url, data=params, timeout=60)
+            response = self.session.post(url, data=params, timeout=60)
             
             if response.status_code != 200:
                 print(f"请求失败，状态码: {response.status_code}")
                 return {"ok": False, "err_no": -1, "failed": f"HTTP错误: {response.status_code}"}
             
-            result = response.json()
-            return result
+            return _decode_response(api_name, response.content)
+        except Exception as e:
+            print(f"请求异常: {e}")
+            return {"ok": False, "err_no": -1, "failed": f"请求异常: {e}"}
+    
+    async def _send_request_async(self, api_name, params):
+        """
+        异步发送HTTP请求
+        
+        Args:
+            api_name: API名称
+            params: 请求参数
+            
+        Returns:
+            dict: 响应结果
+        """
+        url = self._urls[api_name]
+        
+        if self._aio_session is None:
+            self._aio_session = aiohttp.ClientSession(headers=self._headers, timeout=aiohttp.ClientTimeout(total=60))
+        
+        try:
+            async with self._aio_session.post(url, data=params) as response:
+                if response.status != 200:
+                    print(f"请求失败，状态码: {response.status}")
+                    return {"ok": False, "err_no": -1, "failed": f"HTTP错误: {response.status}"}
+                
+                return _decode_response(api_name, await response.read())
         except Exception as e:
             print(f"请求异常: {e}")
             return {"ok": False, "err_no": -1, "failed": f"请求异常: {e}"}
@@ -102,8 +357,31 @@ class XfyunASRResult:
             dict: 进度信息
         """
         params = self._generate_params("getProgress", task_id=task_id)
-        result = self._send_request("getProgress", params)
+        return self._parse_progress(self._send_request("getProgress", params))
+    
+    async def get_progress_async(self, task_id):
+        """
+        异步获取转写进度
+        
+        Args:
+            task_id: 任务ID
+            
+        Returns:
+            dict: 进度信息
+        """
+        params = self._generate_params("getProgress", task_id=task_id)
+        return self._parse_progress(await self._send_request_async("getProgress", params))
+    
+    def _parse_progress(self, result):
+        """
+        解析getProgress接口的响应
         
+        Args:
+            result: 接口响应
+            
+        Returns:
+            dict: 进度信息
+        """
         if result.get("ok") and result.get("data"):
             return result["data"]
         else:
@@ -122,20 +400,38 @@ class XfyunASRResult:
         """
         # 直接向科大讯飞API发送请求获取结果
         params = self._generate_params("getResult", task_id=task_id)
-        result = self._send_request("getResult", params)
+        return self._parse_result(self._send_request("getResult", params))
+    
+    async def get_result_async(self, task_id):
+        """
+        异步获取转写结果
+        
+        Args:
+            task_id: 任务ID
+            
+        Returns:
+            list: 转写结果文本列表
+        """
+        params = self._generate_params("getResult", task_id=task_id)
+        return self._parse_result(await self._send_request_async("getResult", params))
+    
+    def _parse_result(self, result):
+        """
+        解析getResult接口的响应，提取转写结果文本
         
+        Args:
+            result: 接口响应
+            
+        Returns:
+            list: 转写结果文本列表
+        """
         if result.get("ok") and result.get("data"):
             # 提取转写结果文本
             try:
-                sentences = []
-                for sentence in result["data"].get("lattice", []):
-                    if "json_1best" in sentence:
-                        json_result = json.loads(sentence["json_1best"])
-                        if "st" in json_result and "rt" in json_result["st"]:
-                            for word in json_result["st"]["rt"][0]["ws"]:
-                                for character in word["cw"]:
-                                    sentences.append(character["w"])
-                return ''.join(sentences)
+                # 单个生成器表达式直接交给join，不构造中间的字词列表
+                words_from_1best = _words_from_1best
+                return ''.join(w for sentence in result["data"].get("lattice", []) if "json_1best" in sentence
+                               for w in words_from_1best(sentence["json_1best"]))
             except Exception as e:
                 print(f"解析转写结果失败: {str(e)}")
                 return result["data"]
@@ -143,24 +439,28 @@ class XfyunASRResult:
             print(f"获取结果失败: {result.get('failed', '未知错误')}")
             return None
     
-    def wait_for_result(self, task_id, timeout=3600, interval=5):
+    def wait_for_result(self, task_id, timeout=3600, interval=2, max_interval=60):
         """
-        等待并获取转写结果
+        等待并获取转写结果，轮询间隔按指数退避增长，任务状态变化时重新从初始间隔开始
         
         Args:
             task_id: 任务ID
             timeout: 超时时间（秒）
-            interval: 轮询间隔（秒）
+            interval: 初始轮询间隔（秒）
+            max_interval: 最大轮询间隔（秒）
             
         Returns:
             dict: 转写结果
         """
         start_time = time.time()
+        attempt = 0
+        last_status = None
         while time.time() - start_time < timeout:
             progress = self.get_progress(task_id)
             if not progress:
                 print("获取进度失败")
-                time.sleep(interval)
+                time.sleep(next_delay(attempt, interval, max_interval))
+                attempt += 1
                 continue
             
             status = progress.get("status")
@@ -170,7 +470,11 @@ class XfyunASRResult:
             elif status >= 0:
                 progress_percent = progress.get("progress", 0)
                 print(f"转写进度: {progress_percent}%，状态码: {status}")
-                time.sleep(interval)
+                if status != last_status:
+                    attempt = 0
+                    last_status = status
+                time.sleep(next_delay(attempt, interval, max_interval))
+                attempt += 1
             else:
                 print(f"转写失败，状态码: {status}")
                 return None
@@ -178,6 +482,36 @@ class XfyunASRResult:
         print(f"等待超时，已等待{timeout}秒")
         return None
     
+    async def wait_for_result_async(self, task_id, timeout=3600, interval=2, max_interval=60):
+        """
+        异步等待并获取转写结果，同一实例上并发等待的多个任务由ProgressPoller统一批量轮询
+        
+        Args:
+            task_id: 任务ID
+            timeout: 超时时间（秒）
+            interval: 初始轮询间隔（秒），仅在首次创建轮询器时生效
+            max_interval: 最大轮询间隔（秒），仅在首次创建轮询器时生效
+            
+        Returns:
+            dict: 转写结果
+        """
+        if self._poller is None:
+            self._poller = ProgressPoller(self, interval=interval, max_interval=max_interval)
+        
+        try:
+            progress = await asyncio.wait_for(self._poller.wait(task_id), timeout)
+        except asyncio.TimeoutError:
+            print(f"等待超时，已等待{timeout}秒")
+            return None
+        
+        status = progress.get("status")
+        if status == 9:
+            print("转写完成，正在获取结果...")
+            return await self.get_result_async(task_id)
+        
+        print(f"转写失败，状态码: {status}")
+        return None
+    
     def format_transcript_to_text(self, result):
         """
         将转写结果格式化为完整文本
@@ -195,38 +529,22 @@ class XfyunASRResult:
             # 解析JSON数据
             data = result["data"]
             
-            # 按说话人分组
-            speaker_texts = {}
+            # 提取所有非空的 (说话人, 文本)，说话人ID缺失时使用默认值"0"
+            pairs = [(item.get("speaker", "0"), onebest) for item in data
+                     if (onebest := item.get("onebest", "")).strip()]
             
-            for item in data:
-                if "onebest" not in item or not item["onebest"].strip():
-                    continue
-                
-                # 获取说话人ID，如果没有则使用默认值"0"
-                speaker = item.get("speaker", "0")
-                
-                # 如果这个说话人还没有文本，初始化一个空列表
-                if speaker not in speaker_texts:
-                    speaker_texts[speaker] = []
-                
-                # 添加这个说话人的文本
-                speaker_texts[speaker].append(item["onebest"])
-            
-            # 格式化输出文本
-            formatted_text = ""
+            # 如果只有一个说话人，直接输出文本，无需分组
+            if len({speaker for speaker, _ in pairs}) <= 1:
+                return "\n".join(text for _, text in pairs)
             
-            # 如果只有一个说话人，直接输出文本
-            if len(speaker_texts) == 1:
-                speaker = list(speaker_texts.keys())[0]
-                formatted_text = "\n".join(speaker_texts[speaker])
-            else:
-                # 如果有多个说话人，按说话人分段输出
-                for speaker, texts in speaker_texts.items():
-                    formatted_text += f"【说话人 {speaker}】\n"
-                    formatted_text += "\n".join(texts)
-                    formatted_text += "\n\n"
+            # 如果有多个说话人，按说话人分段输出
+            speaker_texts = defaultdict(list)
+            for speaker, text in pairs:
+                speaker_texts[speaker].append(text)
             
-            return formatted_text
+            parts = [f"【说话人 {speaker}】\n" + "\n".join(texts) for speaker, texts in speaker_texts.items()]
+            # 每段之后保留一个空行，与原有输出格式一致
+            return "\n\n".join(parts) + "\n\n"
         except Exception as e:
             print(f"格式化文本时出错: {e}")
             return f"格式化文本时出错: {e}"
@@ -236,10 +554,15 @@ def get_result_command(args):
     """获取转写结果命令处理函数"""
     asr = XfyunASRResult(args.app_id, args.secret_key)
     
-    if args.wait:
-        result = asr.wait_for_result(args.task_id, args.timeout, args.interval)
-    else:
-        result = asr.get_result(args.task_id)
+    async def fetch():
+        try:
+            if args.wait:
+                return await asr.wait_for_result_async(args.task_id, args.timeout, args.interval)
+            return await asr.get_result_async(args.task_id)
+        finally:
+            await asr.aclose()
+    
+    result = asyncio.run(fetch())
     
     if not result:
         error_result = {
@@ -254,8 +577,8 @@ def get_result_command(args):
         
         if args.output_file:
             try:
-                with open(args.output_file, 'w', encoding='utf-8') as f:
-                    f.write(formatted_text)
+                with open(args.output_file, 'wb', buffering=1024 * 1024) as f:
+                    f.write(formatted_text.encode('utf-8'))
                 print(f"格式化文本已保存到: {args.output_file}")
             except Exception as e:
                 print(f"保存文件时出错: {e}")
@@ -286,7 +609,7 @@ def main():
     parser.add_argument('--task_id', required=True, help='转写任务ID')
     parser.add_argument('--wait', action='store_true', help='是否等待转写完成')
     parser.add_argument('--timeout', type=int, default=3600, help='等待超时时间（秒）')
-    parser.add_argument('--interval', type=int, default=5, help='轮询间隔（秒）')
+    parser.add_argument('--interval', type=int, default=2, help='初始轮询间隔（秒），之后按指数退避增长')
     parser.add_argument('--format_text', action='store_true', help='是否格式化为完整文本')
     parser.add_argument('--output_file', help='输出文件路径')
     
@@ -299,6 +622,21 @@ if __name__ == '__main__':
     main()
 
 
+# 按 (app_id, secret_key) 缓存的查询客户端，重复查询时复用同一个HTTP会话
+@lru_cache(maxsize=128)
+def _get_client(app_id, secret_key):
+    """
+    获取指定凭证的查询客户端，不存在时创建
+    
+    Args:
+        app_id: 科大讯飞应用ID
+        secret_key: 应用密钥
+        
+    Returns:
+        XfyunASRResult: 查询客户端
+    """
+    return XfyunASRResult(app_id, secret_key)
+
 # 用于FastAPI的结果查询函数
 def get_result(task_id, app_id=None, secret_key=None):
     """
@@ -332,7 +670,7 @@ def get_result(task_id, app_id=None, secret_key=None):
         if not task:
             try:
                 print(f"尝试直接使用科大讯飞API查询任务: {task_id}")
-                result_api = XfyunASRResult(app_id, secret_key)
+                result_api = _get_client(app_id, secret_key)
                 # 先检查进度
                 progress = result_api.get_progress(task_id)
                 
@@ -368,7 +706,7 @@ def get_result(task_id, app_id=None, secret_key=None):
                 
                 # 如果有有效的API凭证，则尝试获取结果
                 if used_app_id and used_secret_key and xfyun_task_id:
-                    result_api = XfyunASRResult(used_app_id, used_secret_key)
+                    result_api = _get_client(used_app_id, used_secret_key)
                     # 查询转写进度
                     progress = result_api.get_progress(xfyun_task_id)
                     
@@ -6,32 +6,57 @@
 """
 import os
 import time
+import asyncio
 import hashlib
 import base64
+import contextlib
 import json
+import aiohttp
 import requests
+import shutil
+import subprocess
 import tempfile
-from moviepy.editor import VideoFileClip
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from string import ascii_lowercase
+from requests.adapters import HTTPAdapter
+
+# moviepy仅在系统中没有ffmpeg命令时作为提取音频的备选方案
+try:
+    from moviepy.editor import VideoFileClip
+except ImportError:
+    VideoFileClip = None
+
+# 系统中可用的ffmpeg命令路径
+FFMPEG = shutil.which("ffmpeg")
+
+# 上传分片大小（10MB）
+SLICE_BYTES = 10 * 1024 * 1024
+
+# 同时上传的分片数量，内存中最多同时保留这么多个分片
+UPLOAD_CONCURRENCY = 4
+
+# 单个分片上传失败后的最大尝试次数
+SLICE_ATTEMPTS = 3
+
+# 需要先提取音频轨道的视频格式
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.m4v', '.webm')
+
+def _read_slice(file_path, offset):
+    """读取从offset开始的一个分片"""
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        return f.read(SLICE_BYTES)
 
 class SliceIdGenerator:
-    """生成上传分片ID的工具类"""
+    """生成上传分片ID的工具类，分片ID是以'a'为0的10位26进制数"""
     def __init__(self):
-        self.__ch = 'aaaaaaaaa`'
+        # 按字典序依次产生10位小写字母组合，第一个分片ID为'aaaaaaaaaa'，进位由C实现的product完成
+        self._ids = map(''.join, product(ascii_lowercase, repeat=10))
         
     def get_next_slice_id(self):
         """获取下一个分片ID"""
-        ch = self.__ch
-        j = len(ch) - 1
-        while j >= 0:
-            cj = ch[j]
-            if cj != 'z':
-                ch = ch[:j] + chr(ord(cj) + 1) + ch[j+1:]
-                break
-            else:
-                ch = ch[:j] + 'a' + ch[j+1:]
-                j -= 1
-        self.__ch = ch
-        return ch
+        return next(self._ids)
 
 
 class XfyunASRUpload:
@@ -47,6 +72,20 @@ class XfyunASRUpload:
         self.app_id = app_id
         self.secret_key = secret_key
         self.base_url = "https://raasr.xfyun.cn/api"
+        # 各接口的完整URL和公共请求头只构造一次
+        self._urls = {name: f"{self.base_url}/{name}" for name in ("prepare", "upload", "merge", "getProgress", "getResult")}
+        self._headers = {"User-Agent": "xfyun-asr-tool/1.0"}
+        # 签名所需的字节串只编码一次
+        self._app_id_bytes = app_id.encode()
+        self._secret_key_bytes = secret_key.encode()
+        # 复用HTTPS连接，避免每次请求都重新握手
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        self._session.headers.update(self._headers)
+    
+    def close(self):
+        """关闭HTTP会话，释放连接池"""
+        self._session.close()
         
     def _generate_signature(self):
         """
@@ -57,11 +96,11 @@ class XfyunASRUpload:
         """
         # 当前时间戳，13位
         timestamp = str(int(time.time() * 1000))
-        # 拼接字符串
-        base_string = self.app_id + timestamp
-        # 使用应用密钥生成hmac-sha1签名
-        signature = hashlib.md5(base_string.encode() + self.secret_key.encode()).hexdigest()
-        return signature, timestamp
+        # 依次写入 app_id、时间戳、应用密钥 计算MD5，不拼接中间字符串
+        h = hashlib.md5(self._app_id_bytes)
+        h.update(timestamp.encode('ascii'))
+        h.update(self._secret_key_bytes)
+        return h.hexdigest(), timestamp
     
     def _generate_params(self, api_name, task_id=None, slice_id=None, file_path=None):
         """
@@ -85,11 +124,12 @@ class XfyunASRUpload:
         }
         
         if api_name == "prepare":
-            # 文件后缀名
-            ext = os.path.basename(file_path).split('.')[-1]
-            params["file_len"] = os.path.getsize(file_path)
-            params["file_name"] = os.path.basename(file_path)
-            params["slice_num"] = 1
+            # 只做一次stat和basename
+            file_len = os.stat(file_path).st_size
+            file_name = os.path.basename(file_path)
+            params["file_len"] = file_len
+            params["file_name"] = file_name
+            params["slice_num"] = max(1, (file_len + SLICE_BYTES - 1) // SLICE_BYTES)
             # 转写类型，默认为中文
             params["language"] = "cn"
             # 是否开启分词
@@ -130,13 +170,13 @@ class XfyunASRUpload:
         Returns:
             dict: 响应结果
         """
-        url = f"{self.base_url}/{api_name}"
+        url = self._urls[api_name]
         
         try:
             if files:
-                response = requests.post(url, data=params, files=files, timeout=60)
+                response = self._session.post(url, data=params, files=files, timeout=60)
             else:
-                response = requests.post(url, data=params, timeout=60)
+                response = self._session.post(url, data=params, timeout=60)
             
             if response.status_code != 200:
                 print(f"请求失败，状态码: {response.status_code}")
@@ -167,9 +207,48 @@ class XfyunASRUpload:
             print(f"预处理失败: {result.get('failed', '未知错误')}")
             return None
     
+    def _slice_ids(self, file_path):
+        """
+        按文件大小生成全部分片ID
+        
+        Args:
+            file_path: 音频文件路径
+            
+        Returns:
+            list: 分片ID列表
+        """
+        slice_num = max(1, (os.stat(file_path).st_size + SLICE_BYTES - 1) // SLICE_BYTES)
+        slice_id_generator = SliceIdGenerator()
+        return [slice_id_generator.get_next_slice_id() for _ in range(slice_num)]
+    
+    def _upload_slice(self, task_id, slice_id, chunk, file_name):
+        """
+        同步上传单个分片，失败时重试
+        
+        Args:
+            task_id: 任务ID
+            slice_id: 分片ID
+            chunk: 分片数据
+            file_name: 文件名
+            
+        Returns:
+            bool: 是否上传成功
+        """
+        for attempt in range(1, SLICE_ATTEMPTS + 1):
+            # 每次尝试重新签名
+            params = self._generate_params("upload", task_id=task_id, slice_id=slice_id)
+            files = {"file": (file_name, chunk, 'application/octet-stream')}
+            result = self._send_request("upload", params, files=files)
+            if result.get("ok"):
+                return True
+            
+            print(f"上传分片 {slice_id} 失败（第{attempt}次）: {result.get('failed', '未知错误')}")
+        
+        return False
+    
     def upload(self, task_id, file_path):
         """
-        上传文件接口
+        上传文件接口，各分片通过线程池并发上传；在事件循环中请使用upload_slices
         
         Args:
             task_id: 任务ID
@@ -178,24 +257,91 @@ class XfyunASRUpload:
         Returns:
             bool: 是否上传成功
         """
-        slice_id_generator = SliceIdGenerator()
-        slice_id = slice_id_generator.get_next_slice_id()
+        file_name = os.path.basename(file_path)
+        slice_ids = self._slice_ids(file_path)
         
-        with open(file_path, 'rb') as f:
-            file_content = f.read()
+        # 分片在线程中读取，内存中最多同时保留UPLOAD_CONCURRENCY个分片
+        def send(index, slice_id):
+            chunk = _read_slice(file_path, index * SLICE_BYTES)
+            return self._upload_slice(task_id, slice_id, chunk, file_name)
         
-        files = {
-            "file": file_content
-        }
+        with ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY) as pool:
+            results = list(pool.map(send, range(len(slice_ids)), slice_ids))
+        
+        failed = [slice_id for slice_id, ok in zip(slice_ids, results) if not ok]
+        if failed:
+            print(f"上传失败，{len(failed)}个分片未成功: {failed}")
+            return False
+        return True
+    
+    async def _post_slice(self, session, task_id, slice_id, chunk, file_name):
+        """
+        异步上传单个分片，失败时重试
         
-        params = self._generate_params("upload", task_id=task_id, slice_id=slice_id)
-        result = self._send_request("upload", params, files)
+        Args:
+            session: aiohttp会话
+            task_id: 任务ID
+            slice_id: 分片ID
+            chunk: 分片数据
+            file_name: 文件名
+            
+        Returns:
+            bool: 是否上传成功
+        """
+        url = self._urls["upload"]
+        for attempt in range(1, SLICE_ATTEMPTS + 1):
+            # 每次尝试重新签名，FormData也不能重复使用
+            data = aiohttp.FormData(self._generate_params("upload", task_id=task_id, slice_id=slice_id))
+            data.add_field("file", chunk, filename=file_name, content_type='application/octet-stream')
+            try:
+                async with session.post(url, data=data) as response:
+                    if response.status != 200:
+                        failed = f"HTTP错误: {response.status}"
+                    else:
+                        result = await response.json(content_type=None)
+                        if result.get("ok"):
+                            return True
+                        failed = result.get('failed', '未知错误')
+            except Exception as e:
+                failed = f"请求异常: {e}"
+            
+            print(f"上传分片 {slice_id} 失败（第{attempt}次）: {failed}")
         
-        if result.get("ok"):
-            return True
-        else:
-            print(f"上传失败: {result.get('failed', '未知错误')}")
+        return False
+    
+    async def upload_slices(self, task_id, file_path):
+        """
+        异步上传文件接口，并发上传文件的各个分片
+        
+        Args:
+            task_id: 任务ID
+            file_path: 音频文件路径
+            
+        Returns:
+            bool: 是否所有分片都上传成功
+        """
+        file_name = os.path.basename(file_path)
+        slice_ids = self._slice_ids(file_path)
+        
+        # 分片在获得名额后才读取，内存占用与并发数而不是文件大小相关
+        semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+        
+        # 与同步请求一样只限制建立连接和两次读取之间的等待时间，不限制整个分片的上传耗时，慢速上行链路也能传完
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=60, sock_read=60)
+        async with aiohttp.ClientSession(headers=self._headers, timeout=timeout) as session:
+            async def send(index, slice_id):
+                async with semaphore:
+                    chunk = await asyncio.to_thread(_read_slice, file_path, index * SLICE_BYTES)
+                    return await self._post_slice(session, task_id, slice_id, chunk, file_name)
+            
+            results = await asyncio.gather(*(send(i, slice_id) for i, slice_id in enumerate(slice_ids)),
+                                           return_exceptions=True)
+        
+        failed = [slice_id for slice_id, ok in zip(slice_ids, results) if ok is not True]
+        if failed:
+            print(f"上传失败，{len(failed)}个分片未成功: {failed}")
             return False
+        return True
     
     def merge(self, task_id, file_path):
         """
@@ -217,6 +363,43 @@ class XfyunASRUpload:
             print(f"合并失败: {result.get('failed', '未知错误')}")
             return False
     
+    def _extract_audio(self, file_path):
+        """
+        从视频文件中提取音频轨道（16kHz单声道WAV）
+        
+        Args:
+            file_path: 视频文件路径
+            
+        Returns:
+            str: 临时音频文件路径，提取失败时返回None
+        """
+        print(f"检测到视频文件，正在提取音频...")
+        # 创建临时文件
+        temp_fd, temp_audio_file = tempfile.mkstemp(suffix='.wav')
+        os.close(temp_fd)
+        
+        try:
+            # 提取音频：ffmpeg只解复用音频轨道并转为16kHz单声道，不解码视频画面
+            if FFMPEG:
+                subprocess.run(
+                    [FFMPEG, "-y", "-i", file_path, "-vn", "-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1", temp_audio_file],
+                    check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+            elif VideoFileClip is not None:
+                video = VideoFileClip(file_path)
+                video.audio.write_audiofile(temp_audio_file, codec='pcm_s16le')
+                video.close()
+            else:
+                raise RuntimeError("未找到ffmpeg命令，且未安装moviepy")
+        except Exception as e:
+            print(f"提取音频失败: {e}")
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(temp_audio_file)
+            return None
+        
+        print(f"音频提取完成: {temp_audio_file}")
+        return temp_audio_file
+    
     def upload_file(self, file_path):
         """
         上传文件并获取任务ID
@@ -231,58 +414,78 @@ class XfyunASRUpload:
             print(f"文件不存在: {file_path}")
             return None
         
-        # 检查文件类型
-        file_ext = os.path.splitext(file_path)[1].lower()
         temp_audio_file = None
         
-        # 如果是视频文件，提取音频
-        if file_ext in ['.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.m4v', '.webm']:
-            print(f"检测到视频文件，正在提取音频...")
-            try:
-                # 创建临时文件
-                temp_fd, temp_audio_file = tempfile.mkstemp(suffix='.wav')
-                os.close(temp_fd)
-                
-                # 提取音频
-                video = VideoFileClip(file_path)
-                video.audio.write_audiofile(temp_audio_file, codec='pcm_s16le')
-                video.close()
-                
-                print(f"音频提取完成: {temp_audio_file}")
+        try:
+            # 如果是视频文件，提取音频
+            if os.path.splitext(file_path)[1].lower() in VIDEO_EXTENSIONS:
+                temp_audio_file = self._extract_audio(file_path)
+                if not temp_audio_file:
+                    return None
                 file_path = temp_audio_file
-            except Exception as e:
-                print(f"提取音频失败: {e}")
-                if temp_audio_file and os.path.exists(temp_audio_file):
-                    os.remove(temp_audio_file)
+            
+            # 预处理
+            task_id = self.prepare(file_path)
+            if not task_id:
+                return None
+            
+            # 上传文件
+            if not self.upload(task_id, file_path):
+                print("上传文件失败")
                 return None
+            
+            # 合并文件
+            if not self.merge(task_id, file_path):
+                print("合并文件失败")
+                return None
+        finally:
+            # 无论成功与否都删除提取音频生成的临时文件
+            if temp_audio_file:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(temp_audio_file)
         
-        # 预处理
-        task_id = self.prepare(file_path)
-        if not task_id:
-            # 如果是临时文件，删除它
-            if temp_audio_file and os.path.exists(temp_audio_file):
-                os.remove(temp_audio_file)
-            return None
+        print("文件上传成功，任务ID:", task_id)
+        return task_id
+    
+    async def upload_file_async(self, file_path):
+        """
+        异步上传文件并获取任务ID，可在事件循环中直接调用
         
-        # 上传文件
-        if not self.upload(task_id, file_path):
-            print("上传文件失败")
-            # 如果是临时文件，删除它
-            if temp_audio_file and os.path.exists(temp_audio_file):
-                os.remove(temp_audio_file)
+        Args:
+            file_path: 音频或视频文件路径
+            
+        Returns:
+            str: 任务ID
+        """
+        if not os.path.exists(file_path):
+            print(f"文件不存在: {file_path}")
             return None
         
-        # 合并文件
-        if not self.merge(task_id, file_path):
-            print("合并文件失败")
-            # 如果是临时文件，删除它
-            if temp_audio_file and os.path.exists(temp_audio_file):
-                os.remove(temp_audio_file)
-            return None
+        temp_audio_file = None
         
-        # 如果是临时文件，删除它
-        if temp_audio_file and os.path.exists(temp_audio_file):
-            os.remove(temp_audio_file)
+        try:
+            # 提取音频、预处理和合并都是阻塞调用，放到线程中执行
+            if os.path.splitext(file_path)[1].lower() in VIDEO_EXTENSIONS:
+                temp_audio_file = await asyncio.to_thread(self._extract_audio, file_path)
+                if not temp_audio_file:
+                    return None
+                file_path = temp_audio_file
+            
+            task_id = await asyncio.to_thread(self.prepare, file_path)
+            if not task_id:
+                return None
+            
+            if not await self.upload_slices(task_id, file_path):
+                print("上传文件失败")
+                return None
+            
+            if not await asyncio.to_thread(self.merge, task_id, file_path):
+                print("合并文件失败")
+                return None
+        finally:
+            if temp_audio_file:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(temp_audio_file)
         
         print("文件上传成功，任务ID:", task_id)
         return task_id
@@ -292,6 +495,7 @@ def upload_command(args):
     """上传文件命令处理函数"""
     asr = XfyunASRUpload(args.app_id, args.secret_key)
     task_id = asr.upload_file(args.file_path)
+    asr.close()
     
     if task_id:
         result = {
@@ -348,6 +552,35 @@ def handle_upload(file_path, app_id=None, secret_key=None):
     
     # 创建上传实例并处理文件
     asr = XfyunASRUpload(app_id, secret_key)
-    task_id = asr.upload_file(file_path)
+    try:
+        task_id = asr.upload_file(file_path)
+    finally:
+        asr.close()
+    
+    return task_id
+
+
+async def handle_upload_async(file_path, app_id=None, secret_key=None):
+    """
+    处理上传的文件并返回任务ID，供FastAPI等异步接口在事件循环中调用
+    
+    Args:
+        file_path: 上传文件的路径
+        app_id: 科大讯飞应用ID（可选）
+        secret_key: 应用密钥（可选）
+        
+    Returns:
+        str: 任务ID
+    """
+    if app_id is None:
+        app_id = os.environ.get('XFYUN_APP_ID', 'YOUR_APP_ID')
+    if secret_key is None:
+        secret_key = os.environ.get('XFYUN_SECRET_KEY', 'YOUR_SECRET_KEY')
+    
+    asr = XfyunASRUpload(app_id, secret_key)
+    try:
+        task_id = await asr.upload_file_async(file_path)
+    finally:
+        asr.close()
     
     return task_id
@@ -9,30 +9,166 @@ import time
 import hashlib
 import hmac
 import base64
+import binascii
 import json
-import requests
+import logging
+import httpx
 import tempfile
-import traceback
-import datetime
+import sys
 import threading
+from collections import OrderedDict
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Dict, Tuple, Optional, Any
+from typing import Tuple, Optional
+from xfyun_http import create_session
+
+# requests_toolbelt为可选依赖，安装后上传文件时以流的方式编码multipart请求体，不在内存中拼接
+try:
+    from requests_toolbelt import MultipartEncoder
+except ImportError:
+    MultipartEncoder = None
+
+logger = logging.getLogger(__name__)
+
+# orjson为可选依赖，未安装时使用标准库json；orjson.JSONDecodeError是json.JSONDecodeError的子类
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# 新版API订单状态码: (返回的任务状态, 状态描述)，不在表中的状态视为失败
+_STATUS_MAP = {
+    0: ('processing', "任务已创建，等待处理"),
+    1: ('processing', "任务排队中"),
+    2: ('processing', "音频文件上传中"),
+    3: ('processing', "任务处理中"),
+    4: ('completed', "转写完成"),
+    9: ('failed', "任务失败"),
+}
+
+# 转写失败类型对应的原因
+_FAIL_REASONS = {
+    1: "音频格式错误",
+    2: "音频内容无法识别",
+    3: "音频时长超出限制",
+    4: "音频大小超出限制",
+    5: "音频下载失败",
+    6: "音频解码失败",
+    7: "无语音内容",
+    8: "转写引擎错误",
+    9: "账户余额不足",
+    10: "转写超时",
+    11: "其他错误",
+}
+
+# getResult接口的已知错误码: (返回的任务状态, 错误描述)
+_ERROR_CODES = {
+    "26602": ('not_found', "任务ID不存在"),
+    "10001": ('failed', "参数错误"),
+    "10002": ('failed', "系统错误"),
+    "10003": ('failed', "服务忙，请稍后重试"),
+    "10004": ('failed', "未授权，请检查appId和密钥"),
+    "10005": ('failed', "序列号无效"),
+    "10006": ('failed', "序列号已使用"),
+    "10007": ('failed', "序列号已过期"),
+    "10008": ('failed', "序列号类型不匹配"),
+    "10009": ('failed', "资源不存在"),
+    "10010": ('failed', "资源不可用"),
+    "10011": ('failed', "服务已过期"),
+    "10012": ('failed', "访问IP受限"),
+    "10013": ('failed', "访问频率受限"),
+    "10014": ('failed', "余额不足"),
+    "10015": ('failed', "QPS超限"),
+}
+
+# cachetools为可选依赖，未安装时使用基于OrderedDict的同等实现
+try:
+    from cachetools import TTLCache
+except ImportError:
+    TTLCache = None
+
+class _OrderedTTLCache:
+    """
+    带过期时间的LRU缓存，cachetools不可用时替代TTLCache
+    
+    OrderedDict按访问顺序排列条目，淘汰最久未使用的条目只需popitem(last=False)
+    """
+    def __init__(self, maxsize, ttl):
+        """
+        初始化缓存
+        
+        Args:
+            maxsize: 缓存最大条目数
+            ttl: 缓存过期时间（秒）
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+    
+    def get(self, key, default=None):
+        """获取未过期的缓存值，命中时标记为最近使用"""
+        item = self._data.get(key)
+        if item is None:
+            return default
+        
+        expires, value = item
+        if expires < time.monotonic():
+            del self._data[key]
+            return default
+        
+        self._data.move_to_end(key)
+        return value
+    
+    def __setitem__(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+    
+    def pop(self, key, default=None):
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+    
+    def __len__(self):
+        return len(self._data)
+    
+    def clear(self):
+        self._data.clear()
 
 # 结果缓存类
 class ResultCache:
-    """转写结果缓存类，用于存储已完成的转写任务结果"""
-    def __init__(self, max_size=100, expiration_hours=24):
+    """
+    转写结果缓存类，用于存储已完成的转写任务结果
+    
+    按order_id的哈希分成多个分片，每个分片有独立的锁，并发查询不同订单时互不阻塞。
+    处理中的状态也会短暂缓存，频繁轮询同一任务时不会每次都请求讯飞API
+    """
+    # 分片数量，必须是2的幂
+    SHARDS = 16
+    
+    def __init__(self, max_size=100, expiration_hours=24, processing_ttl=10):
         """
         初始化缓存
         
         Args:
             max_size: 缓存最大条目数
             expiration_hours: 缓存过期时间（小时）
+            processing_ttl: 处理中状态的缓存时间（秒）
         """
-        self.cache: Dict[str, Dict[str, Any]] = {}
         self.max_size = max_size
         self.expiration_hours = expiration_hours
-        self.lock = threading.Lock()
+        # 每个缓存分片自行处理过期和按LRU淘汰，查询时也会调整LRU顺序，所以读写都需要加分片锁
+        cache_class = TTLCache if TTLCache is not None else _OrderedTTLCache
+        shard_size = max(1, -(-max_size // self.SHARDS))
+        self._shards = [cache_class(maxsize=shard_size, ttl=expiration_hours * 3600) for _ in range(self.SHARDS)]
+        # 处理中状态单独存放，过期时间很短，与已完成结果共用分片锁
+        self._processing = [cache_class(maxsize=shard_size, ttl=processing_ttl) for _ in range(self.SHARDS)]
+        self._locks = [threading.Lock() for _ in range(self.SHARDS)]
+    
+    def _shard_index(self, order_id: str) -> int:
+        """计算order_id所在的分片"""
+        return hash(order_id) & (self.SHARDS - 1)
     
     def get(self, order_id: str) -> Optional[Tuple[str, str]]:
         """获取缓存的结果
@@ -43,18 +179,15 @@ class ResultCache:
         Returns:
             Tuple[str, str]: (status, result) 或 None（如果缓存中不存在或已过期）
         """
-        with self.lock:
-            if order_id not in self.cache:
-                return None
-            
-            cache_item = self.cache[order_id]
-            # 检查是否过期
-            if self._is_expired(cache_item['timestamp']):
-                # 删除过期缓存
-                del self.cache[order_id]
-                return None
-            
-            return (cache_item['status'], cache_item['result'])
+        index = self._shard_index(order_id)
+        with self._locks[index]:
+            cache_item = self._shards[index].get(order_id)
+            if cache_item is None:
+                cache_item = self._processing[index].get(order_id)
+        
+        if cache_item is None:
+            return None
+        return (cache_item['status'], cache_item['result'])
     
     def set(self, order_id: str, status: str, result: Optional[str]):
         """设置缓存结果
@@ -64,50 +197,139 @@ class ResultCache:
             status: 任务状态
             result: 转写结果
         """
-        with self.lock:
-            # 只缓存已完成的任务
-            if status == 'completed' or status == 'failed':
-                # 如果缓存已满，删除最旧的条目
-                if len(self.cache) >= self.max_size:
-                    self._remove_oldest()
-                
-                self.cache[order_id] = {
+        # 已结束的任务长期缓存，处理中的任务只缓存processing_ttl秒
+        if status == 'completed' or status == 'failed':
+            index = self._shard_index(order_id)
+            with self._locks[index]:
+                self._shards[index][order_id] = {
                     'status': status,
-                    'result': result,
-                    'timestamp': datetime.datetime.now()
+                    'result': result
+                }
+                self._processing[index].pop(order_id, None)
+        elif status == 'processing':
+            index = self._shard_index(order_id)
+            with self._locks[index]:
+                self._processing[index][order_id] = {
+                    'status': status,
+                    'result': None
                 }
-    
-    def _is_expired(self, timestamp: datetime.datetime) -> bool:
-        """检查缓存项是否已过期
-        
-        Args:
-            timestamp: 缓存项的时间戳
-            
-        Returns:
-            bool: 是否已过期
-        """
-        delta = datetime.datetime.now() - timestamp
-        return delta.total_seconds() > self.expiration_hours * 3600
-    
-    def _remove_oldest(self):
-        """删除最旧的缓存项"""
-        if not self.cache:
-            return
-        
-        # 找到最旧的条目
-        oldest_key = min(self.cache.keys(), key=lambda k: self.cache[k]['timestamp'])
-        del self.cache[oldest_key]
     
     def clear(self):
         """清空缓存"""
-        with self.lock:
-            self.cache.clear()
+        for lock, shard, processing in zip(self._locks, self._shards, self._processing):
+            with lock:
+                shard.clear()
+                processing.clear()
 
 # 创建全局缓存实例
 GLOBAL_CACHE = ResultCache()
 
+# 签名复用时间（秒）
+SIGNATURE_TTL = 60
+
+# 签名中的MD5不用于安全目的，Python 3.9+ 标记后在启用FIPS的OpenSSL上也可使用
+if sys.version_info >= (3, 9):
+    _md5 = partial(hashlib.md5, usedforsecurity=False)
+else:
+    _md5 = hashlib.md5
+
+# 异步接口共用的httpx客户端，首次使用时在当前事件循环中创建；启用HTTP/2，多个轮询请求复用同一连接
+_ASYNC_CLIENT = None
+
+def _get_async_client():
+    """
+    获取异步HTTP客户端，不存在时创建
+    
+    Returns:
+        httpx.AsyncClient: 异步HTTP客户端
+    """
+    global _ASYNC_CLIENT
+    if _ASYNC_CLIENT is None or _ASYNC_CLIENT.is_closed:
+        _ASYNC_CLIENT = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            timeout=httpx.Timeout(180.0)
+        )
+    return _ASYNC_CLIENT
+
+async def close_async_client():
+    """关闭异步HTTP客户端，释放连接池"""
+    global _ASYNC_CLIENT
+    if _ASYNC_CLIENT is not None:
+        await _ASYNC_CLIENT.aclose()
+        _ASYNC_CLIENT = None
+
+def _resolve_credentials(app_id, secret_key):
+    """
+    补全API凭证，未提供时从环境变量获取
+    
+    Args:
+        app_id: 科大讯飞应用ID（可选）
+        secret_key: 应用密钥（可选）
+        
+    Returns:
+        tuple: (app_id, secret_key)
+    """
+    if not app_id:
+        app_id = os.environ.get('XFYUN_APP_ID')
+    if not secret_key:
+        secret_key = os.environ.get('XFYUN_SECRET_KEY')
+    
+    if not app_id or not secret_key:
+        raise ValueError("未提供有效的API凭证，请设置XFYUN_APP_ID和XFYUN_SECRET_KEY环境变量或直接传入参数")
+    
+    return app_id, secret_key
+
+def _iter_sentences(items, field):
+    """
+    依次产生lattice/lattice2中每句话的文本，json_1best的类型判断只在每句话开始时做一次
+    
+    lattice只取第一个rt且字段必须完整；lattice2取所有rt并跳过缺失的字段。
+    一句话解析出错时丢弃这句话及其后的内容，已产生的句子保留
+    
+    Args:
+        items: lattice或lattice2列表
+        field: 字段名，"lattice"或"lattice2"
+        
+    Returns:
+        generator: 每句话的文本
+    """
+    strict = field == "lattice"
+    for item in items:
+        if "json_1best" not in item:
+            continue
+        
+        json_1best = item["json_1best"]
+        # 检查json_1best是字符串还是字典
+        if isinstance(json_1best, str):
+            try:
+                json_1best = _loads(json_1best)
+            except json.JSONDecodeError:
+                logger.warning("无法解析%s中的json_1best: %s...", field, item['json_1best'][:50])
+                continue
+        
+        try:
+            st = json_1best.get("st")
+            if not st or "rt" not in st:
+                continue
+            if strict:
+                # 一句话完整解析后才产生
+                yield "".join([char["w"] for word in st["rt"][0]["ws"] for char in word["cw"]])
+            else:
+                for rt in st["rt"]:
+                    if "ws" in rt:
+                        yield "".join([char["w"] for word in rt["ws"] if "cw" in word
+                                       for char in word["cw"] if "w" in char])
+        except (KeyError, IndexError, TypeError, AttributeError) as e:
+            logger.warning("%s解析异常: %s", field, e)
+
 class XfyunASRV2:
     """科大讯飞语音转写API V2版本封装类"""
+    # 所有实例共用的HTTP会话，get_transcription_result每次轮询都会新建实例
+    _SESSION = create_session(backoff_factor=0.3)
+    # 创建订单的upload请求使用不自动重试的会话：重发会创建重复的计费订单，流式请求体也无法重新发送
+    _UPLOAD_SESSION = create_session(pool_connections=1, pool_maxsize=10, retry=False)
+    
     def __init__(self, app_id, secret_key):
         """
         初始化
@@ -120,10 +342,15 @@ class XfyunASRV2:
         self.secret_key = secret_key
         self.base_url = "https://raasr.xfyun.cn/v2/api"
         self.cache = GLOBAL_CACHE  # 使用全局缓存
+        # 最近一次生成的 (signature, timestamp, 过期时间)，有效期内的请求复用同一签名
+        self._sig_cache = None
+        # 签名所需的字节串只编码一次，HMAC密钥的内外填充也只计算一次，每次签名时复制
+        self._app_id_bytes = app_id.encode('utf-8')
+        self._hmac_template = hmac.new(secret_key.encode('utf-8'), digestmod=hashlib.sha1)
     
     def _generate_signature(self):
         """
-        生成API调用签名
+        生成API调用签名，60秒内复用同一个签名和时间戳
         
         签名生成方法：
         1. 将appId和时间戳拼接得到baseString
@@ -133,26 +360,24 @@ class XfyunASRV2:
         Returns:
             tuple: (signature, timestamp)
         """
-        # 当前时间戳，13位
-        timestamp = str(int(time.time() * 1000))
-        print(f"生成签名，时间戳: {timestamp}")
+        now = time.time()
+        cached = self._sig_cache
+        if cached is not None and now < cached[2]:
+            return cached[0], cached[1]
         
-        # 步骤1: 拼接appId和时间戳
-        base_string = self.app_id + timestamp
-        print(f"基础字符串: {base_string}")
+        # 当前时间戳，13位
+        timestamp = str(int(now * 1000))
         
-        # 步骤2: 对baseString进行MD5哈希
-        md5_result = hashlib.md5(base_string.encode('utf-8')).hexdigest()
-        print(f"MD5结果: {md5_result}")
+        # 步骤1和2: 对 appId + 时间戳 进行MD5哈希，直接得到十六进制字节串
+        md5_hex = binascii.hexlify(_md5(self._app_id_bytes + timestamp.encode('ascii')).digest())
         
         # 步骤3: 使用secretKey对MD5结果进行HmacSHA1加密并Base64编码
-        key = self.secret_key.encode('utf-8')
-        message = md5_result.encode('utf-8')
-        hmac_sha1 = hmac.new(key, message, digestmod=hashlib.sha1).digest()
-        signature = base64.b64encode(hmac_sha1).decode('utf-8')
-        print(f"HmacSHA1签名: {signature}")
+        h = self._hmac_template.copy()
+        h.update(md5_hex)
+        signature = base64.b64encode(h.digest()).decode('ascii')
         
-        # 返回签名和时间戳
+        # 讯飞允许时间戳在一定范围内有效，缓存的签名保守地只复用60秒
+        self._sig_cache = (signature, timestamp, now + SIGNATURE_TTL)
         return signature, timestamp
     
     def _send_request(self, api_name, params, files=None):
@@ -168,58 +393,100 @@ class XfyunASRV2:
             dict: 响应结果
         """
         url = f"{self.base_url}/{api_name}"
+        session = self._UPLOAD_SESSION if api_name == "upload" else self._SESSION
         
-        print(f"正在请求API: {url}")
-        print(f"请求参数: {params}")
+        logger.debug("正在请求API: %s", url)
+        logger.debug("请求参数: %s", params)
         
         try:
             if files:
-                print(f"上传文件大小: {len(files['file'][1]) if 'file' in files else '未知'}字节")
-                # 打印文件名称
+                # 打印文件名称，文件内容是打开的文件对象
                 file_name = files['file'][0] if 'file' in files else '未知'
-                print(f"上传文件名称: {file_name}")
+                logger.debug("上传文件名称: %s", file_name)
                 
                 # 添加请求头信息，确保请求格式正确
                 headers = {
                     'Accept': 'application/json',
                 }
                 
-                response = requests.post(url, data=params, files=files, headers=headers, timeout=180)
+                if MultipartEncoder is not None:
+                    # 参数和文件一起流式编码，请求体边读文件边发送，Content-Length预先确定
+                    fields = {name: str(value) for name, value in params.items()}
+                    fields.update(files)
+                    encoder = MultipartEncoder(fields=fields)
+                    headers['Content-Type'] = encoder.content_type
+                    response = session.post(url, data=encoder, headers=headers, timeout=180)
+                else:
+                    response = session.post(url, data=params, files=files, headers=headers, timeout=180)
             else:
-                response = requests.post(url, data=params, timeout=60)
-            
-            print(f"API响应状态码: {response.status_code}")
+                response = session.post(url, data=params, timeout=60)
             
-            if response.status_code != 200:
-                print(f"请求失败，状态码: {response.status_code}，响应内容: {response.text}")
-                return {"code": -1, "message": f"HTTP错误: {response.status_code}, 响应: {response.text}"}
+            return self._handle_response(response)
+        except Exception as e:
+            logger.error("请求异常: %s", e)
+            return {"code": -1, "message": f"请求异常: {e}"}
+    
+    async def _send_request_async(self, api_name, params):
+        """
+        异步发送HTTP请求，用于URL外链上传和查询结果
+        
+        Args:
+            api_name: API名称
+            params: 请求参数
             
-            try:
-                result = response.json()
-                print(f"API响应内容: {result}")
-                
-                # 检查是否有错误信息
-                if "code" in result and result["code"] != 0 and result["code"] != "0":
-                    error_code = result.get("code", "")
-                    error_desc = result.get("descInfo", "")
-                    print(f"请求返回错误码: {error_code}, 错误描述: {error_desc}")
-                    
-                    # 处理特定错误码
-                    if error_code == "26600":
-                        print("转写业务通用错误，可能是参数配置问题")
-                    elif error_code == "26601":
-                        print("非法应用信息，签名验证失败")
-                
-                return result
-            except ValueError as e:
-                # 如果响应不是JSON格式
-                print(f"响应不是JSON格式: {response.text}")
-                return {"code": -1, "message": f"响应格式错误: {e}, 原始响应: {response.text}"}
-                
+        Returns:
+            dict: 响应结果
+        """
+        url = f"{self.base_url}/{api_name}"
+        
+        logger.debug("正在请求API: %s", url)
+        logger.debug("请求参数: %s", params)
+        
+        try:
+            response = await _get_async_client().post(url, data=params, timeout=60)
+            return self._handle_response(response)
         except Exception as e:
-            print(f"请求异常: {e}")
+            logger.error("请求异常: %s", e)
             return {"code": -1, "message": f"请求异常: {e}"}
     
+    def _handle_response(self, response):
+        """
+        处理HTTP响应，requests和httpx的响应对象均可
+        
+        Args:
+            response: HTTP响应
+            
+        Returns:
+            dict: 响应结果
+        """
+        logger.debug("API响应状态码: %s", response.status_code)
+        
+        if response.status_code != 200:
+            logger.warning("请求失败，状态码: %s，响应内容: %s", response.status_code, response.text)
+            return {"code": -1, "message": f"HTTP错误: {response.status_code}, 响应: {response.text}"}
+        
+        try:
+            result = response.json()
+            logger.debug("API响应内容: %s", result)
+            
+            # 检查是否有错误信息
+            if "code" in result and result["code"] != 0 and result["code"] != "0":
+                error_code = result.get("code", "")
+                error_desc = result.get("descInfo", "")
+                logger.debug("请求返回错误码: %s, 错误描述: %s", error_code, error_desc)
+                
+                # 处理特定错误码
+                if error_code == "26600":
+                    logger.warning("转写业务通用错误，可能是参数配置问题")
+                elif error_code == "26601":
+                    logger.warning("非法应用信息，签名验证失败")
+            
+            return result
+        except ValueError as e:
+            # 如果响应不是JSON格式
+            logger.warning("响应不是JSON格式: %s", response.text)
+            return {"code": -1, "message": f"响应格式错误: {e}, 原始响应: {response.text}"}
+    
     def upload_url(self, audio_url):
         """
         使用URL外链方式上传音频文件
@@ -230,6 +497,32 @@ class XfyunASRV2:
         Returns:
             str: 订单ID (orderId)
         """
+        result = self._send_request("upload", self._url_upload_params(audio_url))
+        return self._parse_url_upload(result)
+    
+    async def upload_url_async(self, audio_url):
+        """
+        异步使用URL外链方式上传音频文件
+        
+        Args:
+            audio_url: 音频文件的URL地址
+            
+        Returns:
+            str: 订单ID (orderId)
+        """
+        result = await self._send_request_async("upload", self._url_upload_params(audio_url))
+        return self._parse_url_upload(result)
+    
+    def _url_upload_params(self, audio_url):
+        """
+        构建URL外链上传的请求参数
+        
+        Args:
+            audio_url: 音频文件的URL地址
+            
+        Returns:
+            dict: 请求参数
+        """
         # 生成签名
         signature, timestamp = self._generate_signature()
         
@@ -251,24 +544,32 @@ class XfyunASRV2:
             "audioUrl": audio_url     # 音频URL地址
         }
         
-        print(f"完整的请求参数: {params}")
-        
-        # 发送请求
-        result = self._send_request("upload", params)
+        logger.debug("完整的请求参数: %s", params)
+        return params
+    
+    def _parse_url_upload(self, result):
+        """
+        解析URL外链上传的响应
         
+        Args:
+            result: 接口响应
+            
+        Returns:
+            str: 订单ID (orderId)
+        """
         # 检查响应中是否有content字段，这是新版API的特点
         if "code" in result and result["code"] == "000000" and "content" in result and "orderId" in result["content"]:
             order_id = result["content"]["orderId"]
-            print(f"上传成功，订单ID: {order_id}")
+            logger.info("上传成功，订单ID: %s", order_id)
             return order_id
         # 兼容旧版格式
         elif "code" in result and (result["code"] == 0 or result["code"] == "0") and "orderId" in result:
-            print(f"上传成功，订单ID: {result['orderId']}")
+            logger.info("上传成功，订单ID: %s", result['orderId'])
             return result["orderId"]
         else:
             error_msg = result.get("message", result.get("descInfo", "未知错误"))
             error_code = result.get("code", "未知错误码")
-            print(f"上传失败: 错误码 {error_code}, 错误信息: {error_msg}")
+            logger.warning("上传失败: 错误码 %s, 错误信息: %s", error_code, error_msg)
             return None
     
     def upload_file(self, file_path):
@@ -284,15 +585,10 @@ class XfyunASRV2:
         # 生成签名
         signature, timestamp = self._generate_signature()
         
-        # 检查文件是否存在和大小
-        file_size = os.path.getsize(file_path)
-        print(f"准备上传文件: {file_path}, 大小: {file_size} 字节")
-        
-        # 获取文件名
+        # 检查文件是否存在，一次stat同时得到文件大小
+        file_size = os.stat(file_path).st_size
         file_name = os.path.basename(file_path)
-        
-        # 获取文件大小
-        file_size = os.path.getsize(file_path)
+        logger.debug("准备上传文件: %s, 大小: %s 字节", file_path, file_size)
         
         # 估算音频时长（粗略估计，每秒约为16KB）
         duration = int(file_size / 16000)
@@ -312,81 +608,137 @@ class XfyunASRV2:
         }
         
         # 打印完整的请求参数信息，便于调试
-        print(f"完整的请求参数: {params}")
+        logger.debug("完整的请求参数: %s", params)
         
         # 准备文件
         try:
             with open(file_path, 'rb') as f:
-                file_content = f.read()
-                print(f"成功读取文件内容，大小: {len(file_content)} 字节")
-                
-                # 使用原始文件名
-                file_name = os.path.basename(file_path)
-                
-                # 准备文件上传
+                # 直接传入文件对象，不把整个音频读入内存
                 files = {
-                    "file": (file_name, file_content, 'audio/wav')
+                    "file": (file_name, f, 'audio/wav')
                 }
                 
                 # 发送请求
                 result = self._send_request("upload", params, files)
                 
                 if "code" in result and result["code"] == 0 and "orderId" in result:
-                    print(f"上传成功，订单ID: {result['orderId']}")
+                    logger.info("上传成功，订单ID: %s", result['orderId'])
                     return result["orderId"]
                 else:
                     error_msg = result.get("message", "未知错误")
                     error_code = result.get("code", "未知错误码")
-                    print(f"上传失败: 错误码 {error_code}, 错误信息: {error_msg}")
+                    logger.warning("上传失败: 错误码 %s, 错误信息: %s", error_code, error_msg)
                     return None
         except Exception as e:
-            print(f"文件处理异常: {e}")
+            logger.error("文件处理异常: %s", e)
             raise Exception(f"文件处理异常: {e}")
     
-    def get_result(self, order_id):
+    def get_result(self, order_id, use_cache=True, with_final=False):
         """
         获取转写结果
         
         Args:
             order_id: 订单ID
+            use_cache: 是否使用缓存，为False时既不读取也不写入缓存
+            with_final: 是否在返回值中附加final标记
             
         Returns:
-            tuple: (status, result)
+            tuple: (status, result)，with_final为True时为(status, result, final)
                 status: 任务状态，可能是 'processing', 'completed', 'failed', 'not_found'
                 result: 转写结果，如果任务未完成则为None
+                final: 任务是否已结束，结果不会再变化
         """
         # 首先检查缓存
-        cached_result = self.cache.get(order_id)
-        if cached_result:
-            print(f"从缓存中获取订单 {order_id} 的结果")
+        if use_cache:
+            cached_result = self.cache.get(order_id)
+            if cached_result:
+                logger.debug("从缓存中获取订单 %s 的结果", order_id)
+                return self._with_final(cached_result, with_final)
+        
+        # 缓存中不存在，请求接口
+        result = self._send_request("getResult", self._result_params(order_id))
+        return self._store_result(order_id, self._handle_result(result), use_cache, with_final)
+    
+    async def get_result_async(self, order_id, use_cache=True, with_final=False):
+        """
+        异步获取转写结果
+        
+        Args:
+            order_id: 订单ID
+            use_cache: 是否使用缓存，为False时既不读取也不写入缓存
+            with_final: 是否在返回值中附加final标记
+            
+        Returns:
+            tuple: 含义与get_result相同
+        """
+        if use_cache:
+            cached_result = self.cache.get(order_id)
+            if cached_result:
+                logger.debug("从缓存中获取订单 %s 的结果", order_id)
+                return self._with_final(cached_result, with_final)
+        
+        result = await self._send_request_async("getResult", self._result_params(order_id))
+        return self._store_result(order_id, self._handle_result(result), use_cache, with_final)
+    
+    @staticmethod
+    def _with_final(cached_result, with_final):
+        """缓存中只有已结束的任务和短暂缓存的处理中状态，据此补充final标记"""
+        if not with_final:
             return cached_result
+        status, text = cached_result
+        return status, text, status != 'processing'
+    
+    def _store_result(self, order_id, handled, use_cache, with_final):
+        """
+        按_handle_result的结果写入缓存并构造返回值
         
-        # 缓存中不存在，生成签名
+        已结束的任务长期缓存，处理中的状态短暂缓存以限制轮询频率；
+        请求失败、限流等暂时性错误不缓存，下次查询时重新请求
+        """
+        status, text, final = handled
+        if use_cache and (final or status == 'processing'):
+            self.cache.set(order_id, status, text)
+        return handled if with_final else (status, text)
+    
+    def _result_params(self, order_id):
+        """
+        构建查询结果的请求参数
+        
+        Args:
+            order_id: 订单ID
+            
+        Returns:
+            dict: 请求参数
+        """
         signature, timestamp = self._generate_signature()
         
-        # 构建参数
-        params = {
+        return {
             "appId": self.app_id,
             "signa": signature,
             "ts": timestamp,
             "orderId": order_id
         }
+    
+    def _handle_result(self, result):
+        """
+        处理getResult接口的响应
         
-        # 发送请求
-        result = self._send_request("getResult", params)
-        
+        Args:
+            result: 接口响应
+            
+        Returns:
+            tuple: (status, result, final)，final表示任务已结束、结果不会再变化；
+                请求失败、限流等暂时性错误虽然返回'failed'，但final为False
+        """
         # 处理响应
         if "code" not in result:
-            print(f"API响应缺少code字段: {result}")
-            status, text = 'failed', None
-            # 缓存失败结果
-            self.cache.set(order_id, status, text)
-            return status, text
+            logger.warning("API响应缺少code字段: %s", result)
+            return 'failed', None, False
         
         # 新版API返回格式处理
         if result["code"] == "000000" and "content" in result:
             # 记录成功响应
-            print(f"API请求成功，响应码: {result['code']}")
+            logger.debug("API请求成功，响应码: %s", result['code'])
             content = result["content"]
             
             # 检查订单信息
@@ -394,66 +746,31 @@ class XfyunASRV2:
                 order_info = content["orderInfo"]
                 status_code = order_info.get("status", -1)
                 
-                if status_code == 4:  # 转写完成
+                mapped, desc = _STATUS_MAP.get(status_code, ('failed', "任务状态异常"))
+                
+                if mapped == 'completed':
                     # 解析转写结果
                     try:
                         if "orderResult" in content and content["orderResult"]:
                             text = self._parse_result_v2(content["orderResult"])
-                            # 缓存完成的结果
-                            self.cache.set(order_id, 'completed', text)
-                            return 'completed', text
+                            return 'completed', text, True
                         else:
-                            print("转写结果为空")
-                            # 缓存失败结果
-                            self.cache.set(order_id, 'failed', None)
-                            return 'failed', None
+                            logger.warning("转写结果为空")
                     except Exception as e:
-                        print(f"解析结果失败: {e}")
-                        # 缓存失败结果
-                        self.cache.set(order_id, 'failed', None)
-                        return 'failed', None
-                elif status_code == 3:  # 处理中
-                    est_time = content.get("taskEstimateTime", 0)
-                    print(f"任务处理中，预计剩余时间: {est_time}毫秒")
-                    return 'processing', None
-                elif status_code == 0:  # 已创建
-                    print("任务已创建，等待处理")
-                    return 'processing', None
-                elif status_code == 1:  # 排队中
-                    print("任务排队中")
-                    return 'processing', None
-                elif status_code == 2:  # 上传中
-                    print("音频文件上传中")
-                    return 'processing', None
-                elif status_code == 9:  # 转写失败
-                    fail_type = order_info.get("failType", 99)
-                    fail_reasons = {
-                        1: "音频格式错误",
-                        2: "音频内容无法识别",
-                        3: "音频时长超出限制",
-                        4: "音频大小超出限制",
-                        5: "音频下载失败",
-                        6: "音频解码失败",
-                        7: "无语音内容",
-                        8: "转写引擎错误",
-                        9: "账户余额不足",
-                        10: "转写超时",
-                        11: "其他错误"
-                    }
-                    fail_reason = fail_reasons.get(fail_type, "未知错误")
-                    print(f"任务失败，状态码: {status_code}, 失败类型: {fail_type}, 原因: {fail_reason}")
-                    # 缓存失败结果
-                    self.cache.set(order_id, 'failed', None)
-                    return 'failed', None
-                else:  # 其他状态视为失败
+                        logger.warning("解析结果失败: %s", e)
+                elif mapped == 'processing':
+                    logger.debug("%s，预计剩余时间: %s毫秒", desc, content.get("taskEstimateTime", 0))
+                    return 'processing', None, False
+                else:
                     fail_type = order_info.get("failType", 99)
-                    print(f"任务状态异常，状态码: {status_code}, 失败类型: {fail_type}")
-                    # 缓存失败结果
-                    self.cache.set(order_id, 'failed', None)
-                    return 'failed', None
+                    logger.warning("%s，状态码: %s, 失败类型: %s, 原因: %s",
+                                   desc, status_code, fail_type, _FAIL_REASONS.get(fail_type, "未知错误"))
+                
+                # 订单本身失败，结果不会再变化
+                return 'failed', None, True
             else:
-                print("API响应缺少orderInfo字段")
-                return 'processing', None
+                logger.warning("API响应缺少orderInfo字段")
+                return 'processing', None, False
         # 兼容旧版API返回格式
         elif result["code"] == 0:
             # 检查状态
@@ -463,87 +780,29 @@ class XfyunASRV2:
                 # 解析转写结果
                 try:
                     text = self._parse_result(result)
-                    # 缓存完成的结果
-                    self.cache.set(order_id, 'completed', text)
-                    return 'completed', text
+                    return 'completed', text, True
                 except Exception as e:
-                    print(f"解析结果失败: {e}")
-                    # 缓存失败结果
-                    self.cache.set(order_id, 'failed', None)
-                    return 'failed', None
-            elif status in [0, 1, 2, 3]:  # 排队中或转写中
-                status_desc = {
-                    0: "已创建",
-                    1: "排队中",
-                    2: "上传中",
-                    3: "处理中"
-                }
-                print(f"任务{status_desc.get(status, '处理中')}")
-                return 'processing', None
+                    logger.warning("解析结果失败: %s", e)
+                    return 'failed', None, True
+            elif _STATUS_MAP.get(status, ('failed',))[0] == 'processing':  # 排队中或转写中
+                logger.debug("%s", _STATUS_MAP[status][1])
+                return 'processing', None, False
             else:  # 其他状态视为失败
-                print(f"任务状态异常，状态码: {status}")
-                # 缓存失败结果
-                self.cache.set(order_id, 'failed', None)
-                return 'failed', None
-        # 错误码处理
-        elif result["code"] == 26602 or result["code"] == "26602":  # 任务ID不存在
-            print("任务ID不存在")
-            # 缓存不存在结果
-            self.cache.set(order_id, 'not_found', None)
-            return 'not_found', None
-        elif result["code"] == 10001 or result["code"] == "10001":  # 参数错误
-            error_msg = result.get("message", result.get("descInfo", "参数错误"))
-            print(f"参数错误: {error_msg}")
-            return 'failed', None
-        elif result["code"] == 10002 or result["code"] == "10002":  # 系统错误
-            error_msg = result.get("message", result.get("descInfo", "系统错误"))
-            print(f"系统错误: {error_msg}")
-            return 'failed', None
-        elif result["code"] == 10003 or result["code"] == "10003":  # 服务忙
-            print("服务忙，请稍后重试")
-            return 'failed', None
-        elif result["code"] == 10004 or result["code"] == "10004":  # 未授权
-            print("未授权，请检查appId和密钥")
-            return 'failed', None
-        elif result["code"] == 10005 or result["code"] == "10005":  # 序列号无效
-            print("序列号无效")
-            return 'failed', None
-        elif result["code"] == 10006 or result["code"] == "10006":  # 序列号已使用
-            print("序列号已使用")
-            return 'failed', None
-        elif result["code"] == 10007 or result["code"] == "10007":  # 序列号已过期
-            print("序列号已过期")
-            return 'failed', None
-        elif result["code"] == 10008 or result["code"] == "10008":  # 序列号类型不匹配
-            print("序列号类型不匹配")
-            return 'failed', None
-        elif result["code"] == 10009 or result["code"] == "10009":  # 资源不存在
-            print("资源不存在")
-            return 'failed', None
-        elif result["code"] == 10010 or result["code"] == "10010":  # 资源不可用
-            print("资源不可用")
-            return 'failed', None
-        elif result["code"] == 10011 or result["code"] == "10011":  # 服务已过期
-            print("服务已过期")
-            return 'failed', None
-        elif result["code"] == 10012 or result["code"] == "10012":  # 访问IP受限
-            print("访问IP受限")
-            return 'failed', None
-        elif result["code"] == 10013 or result["code"] == "10013":  # 访问频率受限
-            print("访问频率受限")
-            return 'failed', None
-        elif result["code"] == 10014 or result["code"] == "10014":  # 余额不足
-            print("余额不足")
-            return 'failed', None
-        elif result["code"] == 10015 or result["code"] == "10015":  # QPS超限
-            print("QPS超限")
-            return 'failed', None
-        else:  # 其他错误
+                logger.warning("任务状态异常，状态码: %s", status)
+                return 'failed', None, True
+        # 已知错误码直接查表，服务忙、限流等错误可能是暂时的，不视为任务结束
+        elif (entry := _ERROR_CODES.get(str(result["code"]))) is not None:
+            status, desc = entry
+            detail = result.get("message", result.get("descInfo"))
+            if detail:
+                logger.warning("%s: %s", desc, detail)
+            else:
+                logger.warning("%s", desc)
+            return status, None, False
+        else:  # 其他错误，包括网络异常和HTTP错误（code为-1）
             error_msg = result.get("message", result.get("descInfo", "未知错误"))
-            print(f"API请求失败，错误码: {result['code']}, 错误信息: {error_msg}")
-            # 缓存失败结果
-            self.cache.set(order_id, 'failed', None)
-            return 'failed', None
+            logger.warning("API请求失败，错误码: %s, 错误信息: %s", result['code'], error_msg)
+            return 'failed', None, False
     
     def _parse_result_v2(self, result_str):
         """
@@ -556,27 +815,27 @@ class XfyunASRV2:
             str: 格式化后的文本
         """
         if not result_str:
-            print("转写结果为空")
+            logger.warning("转写结果为空")
             return ""
         
         try:
             # 检查result_str的类型并进行相应处理
             if isinstance(result_str, str):
                 try:
-                    content = json.loads(result_str)
-                    print("成功解析JSON字符串结果")
+                    content = _loads(result_str)
+                    logger.debug("成功解析JSON字符串结果")
                 except json.JSONDecodeError:
-                    print(f"无法解析JSON字符串: {result_str[:100]}...")
+                    logger.warning("无法解析JSON字符串: %s...", result_str[:100])
                     # 尝试直接返回字符串，可能是纯文本结果
                     if len(result_str) > 5:  # 假设有意义的文本至少有几个字符
-                        print("将字符串作为纯文本结果返回")
+                        logger.debug("将字符串作为纯文本结果返回")
                         return result_str
                     return "解析结果失败"
             elif isinstance(result_str, dict):
                 content = result_str
-                print("使用字典类型结果")
+                logger.debug("使用字典类型结果")
             else:
-                print(f"不支持的结果类型: {type(result_str)}")
+                logger.warning("不支持的结果类型: %s", type(result_str))
                 return "解析结果失败"
             
             # 提取文本内容
@@ -584,73 +843,27 @@ class XfyunASRV2:
             
             # 如果是纯文本内容，直接返回
             if isinstance(content, str) and len(content) > 5:
-                print("返回纯文本内容")
+                logger.debug("返回纯文本内容")
                 return content
                 
             # 如果内容是字符串并且可能是已经格式化的文本
             if "text" in content and isinstance(content["text"], str) and len(content["text"]) > 0:
-                print("使用text字段的内容")
+                logger.debug("使用text字段的内容")
                 return content["text"]
                 
             # 检查是否有分段结果
             if "lattice" in content:
-                print("使用lattice字段解析结果")
-                for item in content["lattice"]:
-                    if "json_1best" in item:
-                        # 检查json_1best是字符串还是字典
-                        if isinstance(item["json_1best"], str):
-                            try:
-                                json_result = json.loads(item["json_1best"])
-                            except json.JSONDecodeError:
-                                print(f"无法解析json_1best: {item['json_1best'][:50]}...")
-                                continue
-                        else:
-                            json_result = item["json_1best"]
-                            
-                        if "st" in json_result and "rt" in json_result["st"]:
-                            try:
-                                sentence = ""
-                                for word in json_result["st"]["rt"][0]["ws"]:
-                                    for char in word["cw"]:
-                                        sentence += char["w"]
-                                full_text += sentence
-                            except (KeyError, IndexError, TypeError) as e:
-                                print(f"lattice解析异常: {e}")
+                logger.debug("使用lattice字段解析结果")
+                full_text = "".join(_iter_sentences(content["lattice"], "lattice"))
             
             # 如果没有提取到内容，尝试使用lattice2
             if not full_text and "lattice2" in content:
-                print("使用lattice2字段解析结果")
-                for item in content["lattice2"]:
-                    if "json_1best" in item:
-                        # 检查json_1best是字符串还是字典
-                        if isinstance(item["json_1best"], str):
-                            try:
-                                json_1best = json.loads(item["json_1best"])
-                            except json.JSONDecodeError:
-                                print(f"无法解析lattice2中的json_1best: {item['json_1best'][:50]}...")
-                                continue
-                        else:
-                            json_1best = item["json_1best"]
-                            
-                        if "st" in json_1best:
-                            try:
-                                st = json_1best["st"]
-                                if "rt" in st:
-                                    for rt in st["rt"]:
-                                        if "ws" in rt:
-                                            sentence = ""
-                                            for word in rt["ws"]:
-                                                if "cw" in word:
-                                                    for char in word["cw"]:
-                                                        if "w" in char:
-                                                            sentence += char["w"]
-                                            full_text += sentence
-                            except (KeyError, IndexError, TypeError) as e:
-                                print(f"lattice2解析异常: {e}")
+                logger.debug("使用lattice2字段解析结果")
+                full_text = "".join(_iter_sentences(content["lattice2"], "lattice2"))
             
             # 尝试使用nbest字段
             if not full_text and "nbest" in content and len(content["nbest"]) > 0:
-                print("使用nbest字段解析结果")
+                logger.debug("使用nbest字段解析结果")
                 try:
                     # 使用第一个结果
                     if isinstance(content["nbest"][0], str):
@@ -658,11 +871,11 @@ class XfyunASRV2:
                     elif isinstance(content["nbest"][0], dict) and "sentence" in content["nbest"][0]:
                         full_text = content["nbest"][0]["sentence"]
                 except (IndexError, KeyError, TypeError) as e:
-                    print(f"nbest解析异常: {e}")
+                    logger.warning("nbest解析异常: %s", e)
             
             # 尝试使用result字段
             if not full_text and "result" in content:
-                print("使用result字段解析结果")
+                logger.debug("使用result字段解析结果")
                 if isinstance(content["result"], str) and len(content["result"]) > 0:
                     full_text = content["result"]
                 elif isinstance(content["result"], dict) and "text" in content["result"]:
@@ -670,17 +883,17 @@ class XfyunASRV2:
             
             # 如果仍然没有提取到内容，尝试直接使用内容
             if not full_text and isinstance(content, str) and len(content) > 5:
-                print("直接使用内容作为结果")
+                logger.debug("直接使用内容作为结果")
                 full_text = content
             
             # 如果仍然没有提取到内容，返回原始内容以便调试
             if not full_text:
-                print(f"未能提取到文本内容，原始结果: {str(content)[:200]}...")
+                logger.warning("未能提取到文本内容，原始结果: %s...", str(content)[:200])
                 return "未提取到文本内容"
             
             return full_text
         except Exception as e:
-            print(f"解析结果异常: {e}, 堆栈: {traceback.format_exc()}")
+            logger.exception("解析结果异常: %s", e)
             return "解析结果失败"
     
     def _parse_result(self, result):
@@ -698,28 +911,41 @@ class XfyunASRV2:
         
         try:
             # 解析JSON内容
-            content = json.loads(result["content"])
+            content = _loads(result["content"])
             
-            # 提取文本内容
-            full_text = ""
+            # 提取文本内容，逐字收集到列表中，最后一次性拼接
+            parts = []
+            parts_append = parts.append
             
             # 检查是否有分段结果
             if "lattice" in content:
                 for item in content["lattice"]:
                     if "json_1best" in item:
-                        json_result = json.loads(item["json_1best"])
+                        json_result = _loads(item["json_1best"])
                         if "st" in json_result and "rt" in json_result["st"]:
-                            sentence = ""
                             for word in json_result["st"]["rt"][0]["ws"]:
                                 for char in word["cw"]:
-                                    sentence += char["w"]
-                            full_text += sentence
+                                    parts_append(char["w"])
             
-            return full_text
+            return "".join(parts)
         except Exception as e:
-            print(f"解析结果异常: {e}")
+            logger.warning("解析结果异常: %s", e)
             return "解析结果失败"
 
+@lru_cache(maxsize=128)
+def _get_client(app_id, secret_key):
+    """
+    获取指定凭证的客户端，不存在时创建；同一凭证的多次轮询复用同一实例和其中缓存的签名
+    
+    Args:
+        app_id: 科大讯飞应用ID
+        secret_key: 应用密钥
+        
+    Returns:
+        XfyunASRV2: 客户端
+    """
+    return XfyunASRV2(app_id, secret_key)
+
 def upload_audio(file_path, app_id=None, secret_key=None):
     """
     上传音频文件到讯飞服务
@@ -733,14 +959,7 @@ def upload_audio(file_path, app_id=None, secret_key=None):
         str: 订单ID
     """
     # 如果未提供API凭证，尝试从环境变量获取
-    if not app_id:
-        app_id = os.environ.get('XFYUN_APP_ID')
-    if not secret_key:
-        secret_key = os.environ.get('XFYUN_SECRET_KEY')
-    
-    # 检查API凭证
-    if not app_id or not secret_key:
-        raise ValueError("未提供有效的API凭证，请设置XFYUN_APP_ID和XFYUN_SECRET_KEY环境变量或直接传入参数")
+    app_id, secret_key = _resolve_credentials(app_id, secret_key)
     
     # 检查文件是否存在
     if not os.path.exists(file_path):
@@ -751,7 +970,7 @@ def upload_audio(file_path, app_id=None, secret_key=None):
     if file_ext in ['.mp4', '.avi', '.mov', '.flv', '.mkv']:
         try:
             from moviepy.editor import VideoFileClip
-            print(f"检测到视频文件: {file_path}，正在提取音频...")
+            logger.info("检测到视频文件: %s，正在提取音频...", file_path)
             
             # 创建临时文件
             temp_dir = tempfile.gettempdir()
@@ -762,7 +981,7 @@ def upload_audio(file_path, app_id=None, secret_key=None):
             video.audio.write_audiofile(audio_path)
             video.close()
             
-            print(f"音频提取完成: {audio_path}")
+            logger.info("音频提取完成: %s", audio_path)
             file_path = audio_path
         except ImportError:
             raise ImportError("未安装moviepy库，无法处理视频文件。请使用pip install moviepy安装")
@@ -770,7 +989,7 @@ def upload_audio(file_path, app_id=None, secret_key=None):
             raise Exception(f"提取音频失败: {str(e)}")
     
     # 上传文件
-    client = XfyunASRV2(app_id, secret_key)
+    client = _get_client(app_id, secret_key)
     order_id = client.upload_file(file_path)
     
     if not order_id:
@@ -791,24 +1010,32 @@ def upload_audio_by_url(audio_url, app_id=None, secret_key=None):
         str: 订单ID
     """
     # 如果未提供API凭证，尝试从环境变量获取
-    if not app_id:
-        app_id = os.environ.get('XFYUN_APP_ID')
-    if not secret_key:
-        secret_key = os.environ.get('XFYUN_SECRET_KEY')
-    
-    # 检查API凭证
-    if not app_id or not secret_key:
-        raise ValueError("未提供有效的API凭证，请设置XFYUN_APP_ID和XFYUN_SECRET_KEY环境变量或直接传入参数")
+    app_id, secret_key = _resolve_credentials(app_id, secret_key)
     
     # 创建讯飞 API 对象
-    asr = XfyunASRV2(app_id, secret_key)
+    asr = _get_client(app_id, secret_key)
     
     # 使用URL上传
     order_id = asr.upload_url(audio_url)
     
     return order_id
 
-def get_transcription_result(order_id, app_id=None, secret_key=None, use_cache=True):
+async def upload_audio_by_url_async(audio_url, app_id=None, secret_key=None):
+    """
+    异步使用URL外链方式上传音频文件到讯飞服务
+    
+    Args:
+        audio_url: 音频文件的URL地址
+        app_id: 科大讯飞应用ID（可选）
+        secret_key: 应用密钥（可选）
+        
+    Returns:
+        str: 订单ID
+    """
+    app_id, secret_key = _resolve_credentials(app_id, secret_key)
+    return await _get_client(app_id, secret_key).upload_url_async(audio_url)
+
+def get_transcription_result(order_id, app_id=None, secret_key=None, use_cache=True, with_final=False):
     """
     获取转写任务的状态和结果
     
@@ -817,35 +1044,35 @@ def get_transcription_result(order_id, app_id=None, secret_key=None, use_cache=T
         app_id: 科大讯飞应用ID（可选）
         secret_key: 应用密钥（可选）
         use_cache: 是否使用缓存（默认为是）
+        with_final: 是否在返回值中附加final标记（任务已结束、结果不会再变化）
         
     Returns:
-        tuple: (status, result)
+        tuple: (status, result)，with_final为True时为(status, result, final)
             status: 任务状态，可能是 'processing', 'completed', 'failed', 'not_found'
             result: 转写结果，如果任务未完成则为None
     """
-    # 如果使用缓存，先检查全局缓存
-    if use_cache:
-        cached_result = GLOBAL_CACHE.get(order_id)
-        if cached_result:
-            print(f"从全局缓存中获取订单 {order_id} 的结果")
-            return cached_result
-    
     # 如果未提供API凭证，尝试从环境变量获取
-    if not app_id:
-        app_id = os.environ.get('XFYUN_APP_ID')
-    if not secret_key:
-        secret_key = os.environ.get('XFYUN_SECRET_KEY')
-    
-    # 检查API凭证
-    if not app_id or not secret_key:
-        raise ValueError("未提供有效的API凭证，请设置XFYUN_APP_ID和XFYUN_SECRET_KEY环境变量或直接传入参数")
+    app_id, secret_key = _resolve_credentials(app_id, secret_key)
     
-    # 获取结果
-    client = XfyunASRV2(app_id, secret_key)
-    status, result = client.get_result(order_id)
+    # 获取结果，缓存由get_result读写（client.cache即GLOBAL_CACHE）
+    client = _get_client(app_id, secret_key)
+    return client.get_result(order_id, use_cache=use_cache, with_final=with_final)
+
+async def get_transcription_result_async(order_id, app_id=None, secret_key=None, use_cache=True, with_final=False):
+    """
+    异步获取转写任务的状态和结果，在事件循环中轮询时不占用线程
     
-    # 如果使用缓存且任务已完成或失败，将结果存入全局缓存
-    if use_cache and (status == 'completed' or status == 'failed' or status == 'not_found'):
-        GLOBAL_CACHE.set(order_id, status, result)
+    Args:
+        order_id: 订单ID
+        app_id: 科大讯飞应用ID（可选）
+        secret_key: 应用密钥（可选）
+        use_cache: 是否使用缓存（默认为是）
+        with_final: 是否在返回值中附加final标记
+        
+    Returns:
+        tuple: 含义与get_transcription_result相同
+    """
+    app_id, secret_key = _resolve_credentials(app_id, secret_key)
     
-    return status, result
+    client = _get_client(app_id, secret_key)
+    return await client.get_result_async(order_id, use_cache=use_cache, with_final=with_final)
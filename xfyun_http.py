@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+讯飞接口客户端共用的HTTP工具：连接池会话和轮询退避
+"""
+import random
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def next_delay(attempt, base, max_delay):
+    """
+    计算下一次轮询前的等待时间：指数退避并设置上限，叠加±20%的随机抖动，避免多个客户端同步轮询
+    
+    Args:
+        attempt: 当前状态下已轮询的次数
+        base: 初始等待时间（秒）
+        max_delay: 最大等待时间（秒）
+    
+    Returns:
+        float: 等待时间（秒）
+    """
+    return min(max_delay, base * 2 ** attempt) * random.uniform(0.8, 1.2)
+
+
+def create_session(pool_connections=10, pool_maxsize=20, retry=True, backoff_factor=0.5):
+    """
+    创建带连接池的HTTP会话，复用TCP/TLS连接
+    
+    讯飞接口均为POST请求，预处理、合并、创建订单等接口不是幂等的，服务器已经处理但响应超时后重发会创建重复的计费任务。
+    因此只在请求确定没有被处理时重试：连接失败，或服务器返回429/503；读取超时等其他错误不重试
+    
+    Args:
+        pool_connections: 缓存的连接池数量
+        pool_maxsize: 每个连接池的最大连接数
+        retry: 是否自动重试，流式请求体无法回到开头重新发送，需要关闭
+        backoff_factor: 重试之间的退避系数
+    
+    Returns:
+        requests.Session: HTTP会话
+    """
+    max_retries = 0
+    if retry:
+        retry_kwargs = {
+            'total': 3,
+            'connect': 3,
+            'read': 0,
+            'status': 3,
+            'backoff_factor': backoff_factor,
+            'status_forcelist': [429, 503]
+        }
+        try:
+            max_retries = Retry(allowed_methods=frozenset(['POST']), other=0, **retry_kwargs)
+        except TypeError:
+            # urllib3 < 1.26
+            max_retries = Retry(method_whitelist=frozenset(['POST']), **retry_kwargs)
+    
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=max_retries)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session